@@ -1,12 +1,34 @@
-from fastapi import FastAPI
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse
 from langserve import add_routes
+from pydantic import ValidationError
+from sse_starlette.sse import EventSourceResponse
+import json
+import time
 import uvicorn
 
-from models.deberta_model import DebertaConversationAgent
-from models.mistral_model import MistralConversationAgent
+from models.batching import DebertaBatchScheduler
+from models.escalation import EscalationManager
+from models.mistral_session import MistralSessionAnalyzer, TokenCounter, transcript_budget
+from models.registry import ModelRegistry
+from utils.admission import AdmissionController, Overloaded
+from utils.constants import Constants
+from utils.frequency_index import StarterFrequencyIndex
+from utils.metrics import REGISTRY, stage_timer
+from utils.profiler import SlowRequestProfiler
+from utils.score_cache import ScoreCache
+from utils.sessions import SessionStore
+from utils.verdict_cache import VerdictCache
 # from models.qwen_phishme_model import inference_qwen3_phishme
 
-from io_models.deberta import DebertaRequest, DebertaResponse, DebertaResetResponse
+from io_models.mistral_nemo import (ConversationInput, MistralSessionAnalyzeRequest, MistralSessionCreateResponse,
+                                    MistralSessionVerdictResponse)
+from io_models.deberta import (DebertaRequest, DebertaResponse, DebertaResetRequest, DebertaResetResponse,
+                               DebertaSessionCreateRequest, DebertaSessionCreateResponse,
+                               DebertaSessionMessageRequest, DebertaSessionMessageResponse, DebertaStreamFrame)
 
 app = FastAPI(
     title="Scam Detection API Server",
@@ -17,38 +39,241 @@ app = FastAPI(
 # Create a separate app for the LangServe routes
 langserve_app = FastAPI(title="LangServe Endpoints")
 
+# Models are loaded once per process and shared by all requests, as are their cached scores
+score_cache = ScoreCache(max_entries=Constants.SCORE_CACHE_MAX_ENTRIES, db_path=Constants.SCORE_CACHE_DB_PATH)
+registry = ModelRegistry(score_cache=score_cache)
+# One micro-batching scheduler per DeBERTa variant, created at startup
+schedulers = {}
+# Blocking forward passes run here, never on the event loop
+inference_executor = ThreadPoolExecutor(max_workers=Constants.DEBERTA_INFERENCE_THREADS,
+                                        thread_name_prefix="deberta-inference")
+admission = AdmissionController(max_concurrency=Constants.DEBERTA_MAX_CONCURRENCY,
+                                max_queue=Constants.DEBERTA_MAX_QUEUE,
+                                timeout=Constants.DEBERTA_REQUEST_TIMEOUT_S)
+sessions = SessionStore(max_sessions=Constants.SESSION_MAX_COUNT,
+                        ttl_seconds=Constants.SESSION_TTL_S,
+                        max_bytes=Constants.SESSION_MAX_BYTES)
+frequency_index = StarterFrequencyIndex(snapshot_path=Constants.FREQUENCY_INDEX_PATH,
+                                        half_life_seconds=Constants.FREQUENCY_HALF_LIFE_S,
+                                        snapshot_interval=Constants.FREQUENCY_SNAPSHOT_INTERVAL_S)
+
+verdict_cache = VerdictCache(max_entries=Constants.VERDICT_CACHE_MAX_ENTRIES,
+                             ttl_seconds=Constants.VERDICT_CACHE_TTL_S)
+
+# Opt-in: dumps the hottest stacks of requests slower than PROFILE_SLOW_REQUEST_MS
+profiler = SlowRequestProfiler(threshold_s=Constants.PROFILE_SLOW_REQUEST_MS / 1000,
+                               interval_s=Constants.PROFILE_INTERVAL_MS / 1000,
+                               output_dir=Constants.PROFILE_OUTPUT_DIR) if Constants.PROFILE_SLOW_REQUEST_MS > 0 else None
+
+http_in_flight = REGISTRY.gauge("http_requests_in_flight", "Requests being served")
+REGISTRY.gauge("admission_in_flight", "Requests holding an inference slot", fn=lambda: admission.in_flight)
+REGISTRY.gauge("admission_queued", "Requests waiting for an inference slot", fn=lambda: admission.queued)
+for reason in ("queue_full", "queue_timeout", "deadline"):
+    REGISTRY.counter("admission_rejections_total", "Requests shed by admission control", reason=reason,
+                     fn=lambda reason=reason: admission.rejections[reason])
+REGISTRY.gauge("sessions", "Open server-side sessions", fn=lambda: sessions.stats()["sessions"])
+REGISTRY.gauge("session_bytes", "Approximate memory held by session chats", fn=lambda: sessions.stats()["bytes"])
+REGISTRY.counter("score_cache_hits_total", "DeBERTa score cache hits", fn=lambda: score_cache.hits)
+REGISTRY.counter("score_cache_misses_total", "DeBERTa score cache misses", fn=lambda: score_cache.misses)
+REGISTRY.counter("verdict_cache_hits_total", "Mistral verdict cache hits", fn=lambda: verdict_cache.hits)
+REGISTRY.counter("verdict_cache_misses_total", "Mistral verdict cache misses", fn=lambda: verdict_cache.misses)
+REGISTRY.counter("verdict_cache_coalesced_total", "Verdict requests that joined an in-flight LLM call",
+                 fn=lambda: verdict_cache.coalesced)
+REGISTRY.counter("frequency_index_records_total", "Conversation openers recorded", fn=lambda: frequency_index.records)
+
+def starter_frequency(chat: list, turns_before: int):
+    """Counts a conversation's opening message the first time it is seen, otherwise looks it up."""
+    if not chat:
+        return None
+    if turns_before == 0:
+        return frequency_index.record(chat[0]["text"])
+    return frequency_index.lookup(chat[0]["text"])
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail},
+                        headers={"Retry-After": str(int(exc.retry_after))})
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    http_in_flight.inc()
+    token = profiler.begin() if profiler is not None else None
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        http_in_flight.dec()
+        # Route templates (not raw paths) keep the label set bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        REGISTRY.histogram("http_request_duration_seconds", description="Time to response headers",
+                           method=request.method, path=path, status=str(status)).observe(elapsed)
+        if token is not None:
+            profiler.end(token, f"{request.method} {path}")
+
+def start_scheduler(variant: str):
+    schedulers[variant] = DebertaBatchScheduler(registry.scorer(variant), executor=inference_executor,
+                                                cache=score_cache, model_name=registry.model_name(variant))
+    schedulers[variant].start()
+
+def ready_variant(variant: str) -> str:
+    """Rejects requests for unknown variants (404) and for variants still loading (503 + Retry-After)."""
+    if variant not in registry.deberta_variants:
+        raise HTTPException(status_code=404, detail=f"Unknown model variant '{variant}'. Available: {sorted(registry.deberta_variants)}")
+    if variant not in schedulers:
+        state = registry.states[f"deberta:{variant}"]
+        detail = f"Model variant '{variant}' is {state['state']}" + (f": {state['error']}" if "error" in state else ".")
+        raise Overloaded(503, detail, Constants.STARTUP_RETRY_AFTER_S)
+    return variant
+
+@app.on_event("startup")
+async def load_models():
+    """
+    Starts loading and warming up the models in the background so the server accepts
+    requests (and answers /healthz) immediately; each variant's batch scheduler starts
+    as soon as that variant is ready (see /readyz).
+    """
+    if profiler is not None:
+        profiler.start()
+    loop = asyncio.get_running_loop()
+    registry.load_in_background(on_loaded=lambda variant: loop.call_soon_threadsafe(start_scheduler, variant))
+    loop.run_in_executor(None, session_budget)
+    if escalation is not None:
+        escalation.start()
+
+@app.on_event("shutdown")
+async def stop_schedulers():
+    for scheduler in schedulers.values():
+        await scheduler.stop()
+    if escalation is not None:
+        await escalation.stop()
+    inference_executor.shutdown(wait=False)
+    if profiler is not None:
+        profiler.stop()
+    if frequency_index.snapshot_path:
+        await asyncio.get_running_loop().run_in_executor(None, frequency_index.save)
+
 ## DeBerta Routes
 @app.post("/deberta/process", response_model=DebertaResponse)
 async def process_deberta_message(request: DebertaRequest):
     """
     Processes a new message in a conversation using the DebertaConversationAgent.
     """
-    # Create a new agent instance for each request to keep it stateless
-    deberta_agent = DebertaConversationAgent()
+    # Create a lightweight agent per request around the shared pipeline to keep it stateless
+    deberta_agent = registry.deberta_agent(ready_variant(request.model))
     
     # Load the conversation history into the agent
     deberta_agent.chat = [msg.model_dump() for msg in request.history]
     
-    # Process the new message
-    display, df_scores, elapsed = deberta_agent.process_message(request.message, request.role)
+    # Process the new message; scoring is batched with other concurrent requests and
+    # shed with 429/503 when the backlog is full or the deadline cannot be met
+    display, scores, elapsed = await admission.run(
+        lambda: deberta_agent.aprocess_message(request.message, request.role, schedulers[request.model].score,
+                                               inference_executor))
     
+    frequency = starter_frequency(deberta_agent.chat, len(request.history))
+
     # Format the response using our Pydantic model
-    response = DebertaResponse(
-        display_html=display,
-        scores=df_scores.to_dict(orient="records"),
-        inference_time=elapsed,
-        updated_history=deberta_agent.chat # Return the new, updated history
-    )
+    with stage_timer("deberta.serialize"):
+        response = DebertaResponse(
+            display_html=display,
+            scores=scores,
+            inference_time=elapsed,
+            updated_history=deberta_agent.chat, # Return the new, updated history
+            frequency=frequency,
+            context=deberta_agent.last_context,
+            conversation_id=request.conversation_id,
+            # Only conversations the client identifies are escalated: openers are shared across victims
+            escalation=escalate(request.conversation_id, deberta_agent, scores, frequency)
+        )
     
     return response
 
+@app.post("/deberta/sessions", response_model=DebertaSessionCreateResponse)
+async def create_deberta_session(request: DebertaSessionCreateRequest = None):
+    """
+    Opens a server-side conversation so clients only send new messages.
+    """
+    variant = ready_variant(request.model if request is not None else "default")
+    deberta_agent = registry.deberta_agent(variant)
+    session = sessions.create(deberta_agent, variant)
+    return DebertaSessionCreateResponse(session_id=session.session_id)
+
+@app.post("/deberta/sessions/{session_id}/messages", response_model=DebertaSessionMessageResponse)
+async def process_deberta_session_message(session_id: str, request: DebertaSessionMessageRequest):
+    """
+    Processes a new message of a server-side session and returns only the delta.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session '{session_id}'.")
+
+    # Messages of one session are processed in order
+    async with session.lock:
+        deberta_agent = session.agent
+        turns_before = len(deberta_agent.chat)
+        try:
+            display, scores, elapsed = await admission.run(
+                lambda: deberta_agent.aprocess_message(request.message, request.role, schedulers[session.variant].score,
+                                                       inference_executor))
+        finally:
+            # A rejected message was rolled back, but the session is still in use
+            sessions.touch(session)
+        frequency = starter_frequency(deberta_agent.chat, turns_before)
+        escalation_state = escalate(session_id, deberta_agent, scores, frequency)
+
+    with stage_timer("deberta.serialize"):
+        return DebertaSessionMessageResponse(
+            session_id=session_id,
+            display_html=display,
+            scores=scores,
+            inference_time=elapsed,
+            message=deberta_agent.chat[-1] if len(deberta_agent.chat) > turns_before else None,
+            turn=len(deberta_agent.chat),
+            frequency=frequency,
+            context=deberta_agent.last_context,
+            risk=deberta_agent.risk_scores(),
+            tactics=deberta_agent.risk_tactics(),
+            escalation=escalation_state
+        )
+
+@app.delete("/deberta/sessions/{session_id}", response_model=DebertaResetResponse)
+async def delete_deberta_session(session_id: str):
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session '{session_id}'.")
+    return DebertaResetResponse(status="ok", message="Session deleted.")
+
+@app.get("/deberta/stats")
+async def deberta_stats():
+    """Admission queue depth and rejections, plus the histograms of each DeBERTa batch scheduler."""
+    return {
+        "admission": admission.stats(),
+        "sessions": sessions.stats(),
+        "score_cache": score_cache.stats(),
+        "frequency_index": frequency_index.stats(),
+        "schedulers": {variant: scheduler.stats() for variant, scheduler in schedulers.items()},
+    }
+
+@app.get("/metrics", tags=["Health Check"])
+async def metrics():
+    """Prometheus text exposition of stage latencies, queue depths, cache hit counts and token counts."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/deberta/reset", response_model=DebertaResetResponse)
-async def reset_deberta_conversation():
+async def reset_deberta_conversation(request: DebertaResetRequest = None):
     """
     Signals that the conversation history should be cleared.
-    The client is responsible for clearing its stored history.
+    Frees the server-side session when a session_id is given; stateless clients
+    are responsible for clearing their stored history.
     """
-    # On the server, there's no persistent state to clear per user.
+    if request is not None and request.session_id:
+        sessions.delete(request.session_id)
+        return DebertaResetResponse(status="ok", message="Session freed. Open a new session to continue.")
+    # Stateless clients keep no state on the server.
     # This endpoint confirms the reset action for the client.
     return DebertaResetResponse(
         status="ok",
@@ -56,18 +281,329 @@ async def reset_deberta_conversation():
     )
 
 # LLM Routes
-mistral_model = MistralConversationAgent()
-add_routes(langserve_app, mistral_model.inference_mistral(), path="/mistral")
+mistral_model = registry.mistral_agent()
+mistral_chain = mistral_model.inference_mistral(frequency_index=frequency_index, verdict_cache=verdict_cache)
+add_routes(langserve_app, mistral_chain, path="/mistral")
 # add_routes(langserve_app, inference_qwen3_phishme(), path="/qwen3_phishme")
 
+@app.post("/mistral/verdict/stream")
+async def stream_mistral_verdict(request: ConversationInput, stop_early: bool = True):
+    """
+    Server-sent events with the verdict fields as soon as the model has produced them:
+    `label`, `confidence`, one `tactic` event per tactic, then `done` with the verdict.
+    By default generation stops once label and confidence are known.
+    """
+    async def events():
+        try:
+            async for field, value in mistral_model.astream_verdict(request.conversation, request.frequency,
+                                                                    frequency_index=frequency_index,
+                                                                    verdict_cache=verdict_cache,
+                                                                    stop_early=stop_early):
+                yield {"event": field, "data": json.dumps(value)}
+        except Exception as e:
+            yield {"event": "error", "data": json.dumps(str(e))}
+
+    return EventSourceResponse(events())
+
+# Server-side Mistral sessions; the token budget only depends on the (fixed) prompt
+mistral_sessions = SessionStore(max_sessions=Constants.SESSION_MAX_COUNT,
+                                ttl_seconds=Constants.SESSION_TTL_S,
+                                max_bytes=Constants.SESSION_MAX_BYTES)
+# The tokenizer loads in the background at startup; the budget is computed on first use
+token_counter = TokenCounter()
+mistral_transcript_budget = None
+
+def session_budget() -> int:
+    global mistral_transcript_budget
+    if mistral_transcript_budget is None:
+        mistral_transcript_budget = transcript_budget(mistral_model, token_counter)
+    return mistral_transcript_budget
+
+@app.post("/mistral/sessions", response_model=MistralSessionCreateResponse)
+async def create_mistral_session():
+    """
+    Opens a server-side conversation for the Mistral verdict so clients only send new turns.
+    """
+    analyzer = MistralSessionAnalyzer(token_counter, session_budget())
+    session = mistral_sessions.create(analyzer, mistral_model.model_name)
+    return MistralSessionCreateResponse(session_id=session.session_id)
+
+@app.post("/mistral/sessions/{session_id}/analyze", response_model=MistralSessionVerdictResponse)
+async def analyze_mistral_session(session_id: str, request: MistralSessionAnalyzeRequest):
+    """
+    Appends the new turns and returns a verdict on the whole session, sent to the model
+    as a transcript kept under the context budget.
+    """
+    session = mistral_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session '{session_id}'.")
+    if request.signals is not None and len(request.signals) != len(request.messages):
+        raise HTTPException(status_code=422, detail="`signals` must hold one entry per message.")
+
+    async with session.lock:
+        analyzer = session.agent
+        checkpoint = analyzer.checkpoint()
+        analyzer.add_turns([m.model_dump() for m in request.messages], request.signals)
+        mistral_sessions.touch(session)
+        if not analyzer.chat:
+            raise HTTPException(status_code=422, detail="The session has no messages to analyze.")
+        transcript, stats = analyzer.build_transcript()
+        try:
+            # The opener is always kept verbatim, so the frequency lookup still sees it
+            verdict = await mistral_chain.ainvoke({"conversation": transcript, "frequency": request.frequency})
+        except BaseException:
+            # The turns are kept only once a verdict covers them: clients resend them after a failure
+            analyzer.rollback(checkpoint)
+            raise
+
+    return MistralSessionVerdictResponse(session_id=session_id, verdict=verdict, **stats)
+
+@app.delete("/mistral/sessions/{session_id}", response_model=DebertaResetResponse)
+async def delete_mistral_session(session_id: str):
+    if not mistral_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session '{session_id}'.")
+    return DebertaResetResponse(status="ok", message="Session deleted.")
+
+@app.get("/mistral/stats")
+async def mistral_stats():
+    """Verdict cache hit rate, single-flight coalescing, in-flight LLM calls and open sessions."""
+    return {"verdict_cache": verdict_cache.stats(), "sessions": mistral_sessions.stats(),
+            "transcript_budget_tokens": mistral_transcript_budget, "exact_token_counts": token_counter.exact}
+
+## Background escalation
+# Conversations whose DeBERTa scores match an escalation rule get a Mistral verdict in
+# the background; it is pushed to the session's /deberta/ws channel when one is open
+def escalation_transcript(chat: list) -> str:
+    analyzer = MistralSessionAnalyzer(token_counter, session_budget())
+    analyzer.add_turns(chat)
+    return analyzer.build_transcript()[0]
+
+async def push_escalated_verdict(summary: dict):
+    send = live_channels.get(summary["conversation_id"])
+    if send is None:
+        return
+    if summary["status"] == "ready":
+        await send({"type": "verdict", "source": "escalation", "session_id": summary["conversation_id"],
+                    "verdict": summary["verdict"], "rule": summary["rule"], "lane": summary["lane"],
+                    "turns": summary["verdict_turns"], "tactics": summary["tactics"]})
+    else:
+        await send({"type": "error", "code": "verdict_failed", "source": "escalation", "detail": summary["error"],
+                    "turn": summary["verdict_turns"]})
+
+escalation = EscalationManager(mistral_chain, build_transcript=escalation_transcript,
+                               on_verdict=push_escalated_verdict) if Constants.ESCALATION_ENABLED else None
+
+def escalate(conversation_id, agent, scores: list, frequency):
+    """Feeds a scored message to the escalation manager; returns the conversation's escalation summary."""
+    if escalation is None or conversation_id is None:
+        return None
+    risk = agent.risk_scores()
+    return escalation.observe(conversation_id, risk if risk is not None else scores, agent.chat, frequency,
+                              tactics=agent.risk_tactics())
+
+@app.get("/escalations/stats")
+async def escalation_stats():
+    """Tracked conversations by escalation status, queued and running verdicts."""
+    if escalation is None:
+        raise HTTPException(status_code=404, detail="Background escalation is disabled.")
+    return escalation.stats()
+
+@app.get("/escalations/{conversation_id}")
+async def get_escalation(conversation_id: str):
+    """
+    Escalation status of a conversation (a session id, or the conversation_id sent to
+    /deberta/process) and, once ready, its Mistral verdict.
+    """
+    summary = escalation.get(conversation_id) if escalation is not None else None
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No escalation tracked for '{conversation_id}'.")
+    return summary
+
+## Live scoring channel
+# Open /deberta/ws connections by session id, so results produced elsewhere can be pushed to them
+live_channels = {}
+REGISTRY.gauge("live_channels", "Open /deberta/ws connections", fn=lambda: len(live_channels))
+
+def flagged_labels(agent, scores: list) -> list:
+    return [s["Label"] for s in scores if s["Score"] > agent.threshold and s["Label"] != agent.taxonomy.benign_group]
+
+@app.websocket("/deberta/ws")
+async def deberta_live_channel(websocket: WebSocket, session_id: str = None, model: str = "default",
+                               verdicts: str = "off"):
+    """
+    Persistent channel for live chat scoring over one server-side session.
+
+    Opens a new session (or resumes `session_id`) and answers with a `session` frame.
+    The client then sends `{"type": "message", "message", "role", "id"}` frames as
+    messages arrive; each is scored in order and answered with a `scores` frame (the
+    fields of DebertaSessionMessageResponse plus the client's `id`). With `verdicts`
+    set to "flagged" (after turns with flagged signals) or "every" (after every turn),
+    Mistral verdicts on the session transcript are pushed as `verdict` frames; a
+    verdict still running when new turns arrive is followed by one on the latest turns.
+    Verdicts of the background escalation (see /escalations) are pushed as `verdict`
+    frames with `"source": "escalation"` whatever `verdicts` is set to.
+
+    Backpressure: at most Constants.WS_MAX_PENDING messages wait to be scored; more are
+    refused with an `error` frame (code "busy") rather than queued. Heartbeats: the
+    server sends `ping` frames every Constants.WS_HEARTBEAT_S and closes connections
+    silent for Constants.WS_IDLE_TIMEOUT_S; clients may send `ping` to get a `pong`.
+    The session outlives the connection and can be resumed until it expires.
+    """
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+
+    async def send(frame: dict):
+        async with send_lock:
+            await websocket.send_json(frame)
+
+    async def refuse(code: str, detail: str, close_code: int, **extra):
+        await send({"type": "error", "code": code, "detail": detail, **extra})
+        await websocket.close(code=close_code)
+
+    if verdicts not in ("off", "flagged", "every"):
+        return await refuse("invalid", "`verdicts` must be 'off', 'flagged' or 'every'.", 1008)
+    if session_id is not None:
+        session = sessions.get(session_id)
+        if session is None:
+            return await refuse("not_found", f"Unknown or expired session '{session_id}'.", 1008)
+    else:
+        try:
+            variant = ready_variant(model)
+        except HTTPException as e:
+            return await refuse("not_found", e.detail, 1008)
+        except Overloaded as e:
+            return await refuse("loading", e.detail, 1013, retry_after=e.retry_after)
+        session = sessions.create(registry.deberta_agent(variant), variant)
+
+    pending = asyncio.Queue(maxsize=Constants.WS_MAX_PENDING)
+    analyzer = None
+    if verdicts != "off":
+        analyzer = MistralSessionAnalyzer(token_counter, await asyncio.get_running_loop().run_in_executor(None, session_budget))
+        analyzer.add_turns(session.agent.chat)
+    state = {"last_seen": time.monotonic(), "frequency": None, "verdict_task": None, "verdict_stale": False}
+
+    async def push_verdicts():
+        # Runs until a verdict covers the latest turns; triggers arriving meanwhile only mark it stale
+        while True:
+            state["verdict_stale"] = False
+            transcript, stats = analyzer.build_transcript()
+            try:
+                verdict = await mistral_chain.ainvoke({"conversation": transcript, "frequency": state["frequency"]})
+                await send({"type": "verdict", "session_id": session.session_id, "verdict": verdict, **stats})
+            except Exception as e:
+                await send({"type": "error", "code": "verdict_failed", "detail": str(e), "turn": stats["turns"]})
+            if not state["verdict_stale"]:
+                state["verdict_task"] = None
+                return
+
+    def request_verdict():
+        if state["verdict_task"] is None:
+            state["verdict_task"] = asyncio.ensure_future(push_verdicts())
+        else:
+            state["verdict_stale"] = True
+
+    async def score_pending():
+        while True:
+            frame = await pending.get()
+            try:
+                async with session.lock:
+                    agent = session.agent
+                    turns_before = len(agent.chat)
+                    try:
+                        display, scores, elapsed = await admission.run(
+                            lambda: agent.aprocess_message(frame.message, frame.role, schedulers[session.variant].score,
+                                                           inference_executor))
+                    finally:
+                        sessions.touch(session)
+            except Overloaded as e:
+                await send({"type": "error", "code": "overloaded", "id": frame.id, "detail": e.detail,
+                            "retry_after": e.retry_after})
+                continue
+            except Exception as e:
+                await send({"type": "error", "code": "failed", "id": frame.id, "detail": str(e)})
+                continue
+            added = len(agent.chat) > turns_before
+            state["frequency"] = starter_frequency(agent.chat, turns_before)
+            with stage_timer("deberta.serialize"):
+                response = DebertaSessionMessageResponse(
+                    session_id=session.session_id, display_html=display, scores=scores, inference_time=elapsed,
+                    message=agent.chat[-1] if added else None, turn=len(agent.chat), frequency=state["frequency"],
+                    context=agent.last_context, risk=agent.risk_scores(), tactics=agent.risk_tactics(),
+                    escalation=escalate(session.session_id, agent, scores, state["frequency"]))
+            await send({"type": "scores", "id": frame.id, **response.model_dump()})
+            if analyzer is not None and added:
+                flagged = flagged_labels(agent, scores)
+                analyzer.add_turns(agent.chat[-1:], [flagged])
+                if flagged or verdicts == "every":
+                    request_verdict()
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(Constants.WS_HEARTBEAT_S)
+            if time.monotonic() - state["last_seen"] > Constants.WS_IDLE_TIMEOUT_S:
+                await websocket.close(code=1001)
+                return
+            await send({"type": "ping", "ts": time.time()})
+
+    tasks = [asyncio.ensure_future(score_pending()), asyncio.ensure_future(heartbeat())]
+    live_channels[session.session_id] = send
+    try:
+        await send({"type": "session", "session_id": session.session_id, "turn": len(session.agent.chat),
+                    "max_pending": Constants.WS_MAX_PENDING, "heartbeat_s": Constants.WS_HEARTBEAT_S})
+        while True:
+            raw = await websocket.receive_text()
+            state["last_seen"] = time.monotonic()
+            try:
+                frame = DebertaStreamFrame.model_validate_json(raw)
+            except ValidationError as e:
+                await send({"type": "error", "code": "invalid", "detail": str(e)})
+                continue
+            if frame.type == "ping":
+                await send({"type": "pong", "id": frame.id, "ts": time.time()})
+            elif frame.type == "message" and frame.message is not None and frame.role is not None:
+                try:
+                    pending.put_nowait(frame)
+                except asyncio.QueueFull:
+                    await send({"type": "error", "code": "busy", "id": frame.id,
+                                "detail": f"{pending.qsize()} messages are waiting to be scored; resend this one later."})
+            elif frame.type != "pong":
+                await send({"type": "error", "code": "invalid", "id": frame.id,
+                            "detail": "Expected a 'message' frame with `message` and `role`, or 'ping'/'pong'."})
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: receiving after the heartbeat closed an idle connection
+        pass
+    finally:
+        if live_channels.get(session.session_id) is send:
+            del live_channels[session.session_id]
+        if state["verdict_task"] is not None:
+            tasks.append(state["verdict_task"])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
 # Mount the langserve app into the main app under the /api prefix
 app.mount("/api", langserve_app)
 
+@app.get("/healthz", tags=["Health Check"])
+async def healthz():
+    """Liveness: the process is up and its event loop responds, whatever the models are doing."""
+    return {"status": "ok"}
+
+@app.get("/readyz", tags=["Health Check"])
+async def readyz():
+    """Readiness: 200 once every required model is loaded and warmed up, 503 before; lists each model's state."""
+    ready = registry.ready() and all(variant in schedulers for variant in registry.deberta_variants)
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"status": "ready" if ready else "loading", "models": registry.states})
+
 @app.get("/", tags=["Health Check"])
 def read_root():
     return {
         "status": "ok",
         "message": "API is running. Access model playgrounds under the /api path.",
+        "liveness": "/healthz",
+        "readiness": "/readyz",
+        "escalations": "/escalations/stats",
         "main_docs": "/docs",
         "langserve_docs": "/api/docs",
         "mistral_playground": "/api/mistral/playground/",
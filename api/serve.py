@@ -0,0 +1,164 @@
+"""
+Multi-worker server: loads the models once, then forks the workers.
+
+uvicorn's own --workers starts every worker from scratch, so each one would load its
+own copy of DeBERTa. Here the parent imports the app, loads and warms up every model,
+then freezes the garbage collector and forks. Workers share the weights copy-on-write:
+inference never writes to tensor storage, and gc.freeze() keeps collections in the
+workers from touching (and so copying) the pages of the parent's objects. All workers
+accept connections on one listening socket.
+
+The cores available to the process are split into one contiguous slice per worker.
+Each worker is pinned to its slice and runs torch with that many intra-op threads, so
+N workers never run more inference threads than there are cores. The parent keeps
+torch single-threaded, since OpenMP thread pools do not survive fork().
+
+Server-side sessions, caches and the frequency index are per worker: session clients
+should keep one connection open (keep-alive sticks to a worker) or run one worker.
+
+Usage:
+    python -m api.serve --workers 4 --port 8081
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+from utils.constants import Constants
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores() -> list:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cores(cores, workers: int) -> list:
+    """Splits `cores` into `workers` contiguous slices of near-equal size (shared round-robin if too few)."""
+    cores = sorted(cores)
+    if workers >= len(cores):
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    size, extra = divmod(len(cores), workers)
+    slices, start = [], 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        slices.append(cores[start:end])
+        start = end
+    return slices
+
+
+def set_torch_threads(threads: int):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(index: int, sock: socket.socket, cores: list, threads: int, log_level: str):
+    """Body of a forked worker: pin it to its cores, size torch's thread pool, serve until told to stop."""
+    import uvicorn
+    from api.app import app
+
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    set_torch_threads(threads)
+    logger.info("Worker %d (pid %d) serving on cores %s with %d threads", index, os.getpid(), cores, threads)
+    uvicorn.Server(uvicorn.Config(app, log_level=log_level)).run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int, threads_per_worker: int = 0, log_level: str = "info"):
+    # onnxruntime creates its thread pools with the session, i.e. in the parent, and forked
+    # workers do not inherit threads: unless configured otherwise, sessions run on the caller
+    if "SAFECHATTER_ONNX_INTRA_OP_THREADS" not in os.environ:
+        Constants.ONNX_INTRA_OP_THREADS = 1
+    if "SAFECHATTER_ONNX_INTER_OP_THREADS" not in os.environ:
+        Constants.ONNX_INTER_OP_THREADS = 1
+    set_torch_threads(1)
+
+    from api import app as server
+
+    started = time.time()
+    server.registry.load_all()
+    server.session_budget()
+    logger.info("Models loaded in %.1fs: %s", time.time() - started, server.registry.states)
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(host, port)
+    slices = partition_cores(available_cores(), workers)
+    children, stopping = {}, False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            code = 0
+            try:
+                run_worker(index, sock, slices[index], threads_per_worker or len(slices[index]), log_level)
+            except BaseException:
+                logger.exception("Worker %d failed", index)
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(workers):
+        spawn(index)
+    logger.info("Listening on %s:%d with %d workers", host, port, workers)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            logger.warning("Worker %d (pid %d) exited with status %d; restarting it", index, pid, status)
+            time.sleep(1.0)
+            spawn(index)
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from several workers sharing one copy of the models.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--workers", type=int, default=Constants.SERVE_WORKERS)
+    parser.add_argument("--threads-per-worker", type=int, default=Constants.SERVE_THREADS_PER_WORKER,
+                        help="torch intra-op threads per worker (0: the worker's share of the cores).")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s [%(process)d] %(message)s")
+    serve(args.host, args.port, max(1, args.workers), args.threads_per_worker, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Synthetic multi-turn conversations for benchmarks.
+
+Scam conversations walk through the tactic groups of Constants.DEBERTA_INTENT_MAPPING
+in the order pig-butchering scams usually follow (wrong number, flattery, personal
+questions, investment talk, moving to another app, fees, urgency); benign ones are
+small talk. Names, amounts and details are drawn from a seeded RNG, so a seed always
+yields the same workload while every conversation of a run opens with a distinct
+message (so whole-conversation verdicts are not answered from the verdict cache).
+
+Usage:
+    python -m benchmarks.conversations conversations.jsonl --count 1000 --scam-ratio 0.5 --seed 7
+"""
+import argparse
+import json
+import random
+
+from utils.constants import Constants
+
+NAMES = ["Anna", "Jessica", "Linda", "David", "Kevin", "Sophia", "Michael", "Emily", "Daniel", "Grace"]
+APPS = ["WhatsApp", "Telegram", "WeChat", "Line", "Messenger"]
+COINS = ["USDT", "Bitcoin", "ETH", "gold futures", "forex"]
+
+# Sender lines per generic tactic group; {name}, {app}, {coin}, {amount}, {percent} are filled in
+SCAM_TEMPLATES = {
+    "Misidentification": [
+        "Hi {name}, is this the number for the dinner reservation on Friday?",
+        "Hello, is this {name}? My friend gave me this number.",
+        "Oh sorry, I think I have the wrong number. I was looking for {name}.",
+    ],
+    "Flattery": [
+        "You seem like such a kind person, not many people reply so politely.",
+        "Your profile picture is lovely, you must travel a lot.",
+    ],
+    "Personal Info Seeking": [
+        "Where are you from? What do you do for work?",
+        "Are you married? How old are you, if you don't mind me asking?",
+    ],
+    "Financial Gains Opportunity": [
+        "My uncle taught me to trade {coin}, I made {percent}% this month.",
+        "I have a small investment plan with guaranteed returns, {percent}% a week.",
+        "I just bought a new car from my {coin} profits, it is really easy.",
+    ],
+    "Channel Shifting Proposal": [
+        "This app is not convenient, can we talk on {app}?",
+        "Add me on {app}, I can send you pictures there.",
+        "Download {app}, it is better for private messages.",
+    ],
+    "Seeking Financial Support": [
+        "To withdraw your profit you need to pay a verification fee of ${amount}.",
+        "Your account is frozen until you deposit ${amount} for taxes.",
+        "Please help me, I only need ${amount} to release my funds.",
+    ],
+    "Sense of Urgency": [
+        "You must deposit today, the offer closes in 2 hours!",
+        "Hurry, only a few spots are left in this plan.",
+    ],
+}
+SCAM_REPLIES = [
+    "Sorry, I think you have the wrong number.",
+    "Thank you, that's nice of you to say.",
+    "I'm from Ohio, I work as a nurse.",
+    "Really? How does that work?",
+    "I'm not sure, I don't know much about that.",
+    "Ok, what is your username?",
+    "That sounds like a lot of money.",
+]
+BENIGN_LINES = [
+    "Hey {name}, are we still on for lunch tomorrow?",
+    "Yes! Does noon work for you?",
+    "Can you pick up milk on the way home?",
+    "Sure, anything else?",
+    "Did you watch the game last night?",
+    "The meeting moved to 3pm, see you there.",
+    "Happy birthday {name}! Hope you have a great day.",
+    "Thanks so much, see you at the party!",
+    "I sent you the photos from the trip.",
+    "They look great, thanks for sharing.",
+]
+
+
+def _fill(rng: random.Random, template: str) -> str:
+    return template.format(name=rng.choice(NAMES), app=rng.choice(APPS), coin=rng.choice(COINS),
+                           amount=rng.randint(2, 90) * 100, percent=rng.randint(5, 60))
+
+
+def scam_tactics(mapping: dict = None) -> list:
+    """The generic tactic groups of `mapping` in the order a scam conversation uses them."""
+    groups = set((mapping or Constants.DEBERTA_INTENT_MAPPING).values())
+    return [group for group in SCAM_TEMPLATES if group in groups]
+
+
+def generate_conversation(rng: random.Random, conversation_id: str, scam: bool, turns: int) -> dict:
+    """One conversation of `turns` messages alternating between sender and receiver."""
+    messages, tactics = [], []
+    if scam:
+        groups = scam_tactics()
+        for turn in range(turns):
+            if turn % 2 == 0:
+                group = groups[min(turn // 2 * len(groups) // max(1, turns // 2), len(groups) - 1)]
+                tactics.append(group)
+                text = _fill(rng, rng.choice(SCAM_TEMPLATES[group]))
+            else:
+                text = rng.choice(SCAM_REPLIES)
+            messages.append({"role": "sender" if turn % 2 == 0 else "receiver", "text": text})
+    else:
+        for turn in range(turns):
+            messages.append({"role": "sender" if turn % 2 == 0 else "receiver",
+                             "text": _fill(rng, rng.choice(BENIGN_LINES))})
+    # A unique tag keeps conversations of one run from hitting each other's cache entries
+    messages[0]["text"] = f"{messages[0]['text']} ({conversation_id})"
+    return {"conversation_id": conversation_id, "label": "SCAM" if scam else "BENIGN",
+            "tactics": sorted(set(tactics)), "messages": messages, "frequency": rng.randint(0, 500) if scam else 0}
+
+
+def generate_conversations(count: int, scam_ratio: float = 0.5, min_turns: int = 4, max_turns: int = 14,
+                           seed: int = 7):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield generate_conversation(rng, f"c{seed}-{i}", scam=rng.random() < scam_ratio,
+                                    turns=rng.randint(min_turns, max_turns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic scam and benign conversations.")
+    parser.add_argument("output", help="JSONL file, one conversation per line (tools.bulk_score can read it).")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--scam-ratio", type=float, default=0.5)
+    parser.add_argument("--min-turns", type=int, default=4)
+    parser.add_argument("--max-turns", type=int, default=14)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with open(args.output, "w") as f:
+        for conversation in generate_conversations(args.count, args.scam_ratio, args.min_turns, args.max_turns, args.seed):
+            f.write(json.dumps(conversation) + "\n")
+
+
+if __name__ == "__main__":
+    main()
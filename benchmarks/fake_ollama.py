@@ -0,0 +1,101 @@
+"""
+Local stand-in for the Ollama HTTP API, so the Mistral routes can be benchmarked offline.
+
+It answers /api/generate (streamed NDJSON or a single JSON object) with a
+ConversationalScamVerdict whose label follows a keyword heuristic, after a tunable
+prompt-processing delay and per-token delay. Point the server at it with
+SAFECHATTER_OLLAMA_BASE_URL.
+
+Usage:
+    python -m benchmarks.fake_ollama --port 11500 --first-token-ms 300 --token-ms 20 --jitter-ms 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from datetime import datetime, timezone
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+_SCAM_WORDS = re.compile(r"whatsapp|telegram|wechat|invest|profit|deposit|withdraw|fee|usdt|bitcoin|crypto", re.IGNORECASE)
+
+
+def fake_verdict(prompt: str) -> dict:
+    hits = len(_SCAM_WORDS.findall(prompt.rsplit("**Conversation:**", 1)[-1]))
+    if hits >= 2:
+        return {"label": "SCAM", "confidence": min(0.99, 0.6 + 0.1 * hits),
+                "tactics": ["channel_shifting_proposal", "financial_gain_opportunity"]}
+    return {"label": "BENIGN", "confidence": 0.9, "tactics": []}
+
+
+def create_app(first_token_ms: float = 300.0, token_ms: float = 20.0, jitter_ms: float = 0.0,
+               chars_per_token: int = 4, seed: int = 7) -> FastAPI:
+    app = FastAPI(title="Fake Ollama")
+    rng = random.Random(seed)
+
+    def _chunk(model: str, text: str, done: bool, **extra) -> dict:
+        return {"model": model, "created_at": datetime.now(timezone.utc).isoformat(), "response": text,
+                "done": done, **extra}
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-fake"}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "mistral-nemo:12b", "model": "mistral-nemo:12b"}]}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        model = body.get("model", "")
+        prompt = body.get("prompt", "")
+        output = json.dumps(fake_verdict(prompt))
+        tokens = [output[i:i + chars_per_token] for i in range(0, len(output), chars_per_token)]
+        num_predict = (body.get("options") or {}).get("num_predict")
+        if num_predict and num_predict > 0:
+            tokens = tokens[:num_predict]
+        started = time.perf_counter()
+        stats = {"done_reason": "stop", "prompt_eval_count": len(prompt) // chars_per_token,
+                 "eval_count": len(tokens)}
+
+        def final() -> dict:
+            return _chunk(model, "", True, total_duration=int((time.perf_counter() - started) * 1e9), **stats)
+
+        delay = max(0.0, first_token_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000
+        if not body.get("stream", True):
+            await asyncio.sleep(delay + token_ms * len(tokens) / 1000)
+            return {**final(), "response": "".join(tokens)}
+
+        async def stream():
+            await asyncio.sleep(delay)
+            for token in tokens:
+                yield json.dumps(_chunk(model, token, False)) + "\n"
+                await asyncio.sleep(token_ms / 1000)
+            yield json.dumps(final()) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server with tunable latency.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="Prompt processing delay per request.")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="Delay per generated token.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform jitter on the first-token delay.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.first_token_ms, args.token_ms, args.jitter_ms, seed=args.seed),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Load and latency benchmarks for the API server.
+
+Starts benchmarks.fake_ollama and the API server (pointed at it through
+SAFECHATTER_OLLAMA_BASE_URL), replays synthetic conversations against each scenario
+at every requested concurrency, and reports latency percentiles, throughput,
+rejections (429/503) and the server's memory. With --workers the server is started
+through api.serve at each worker count and the report adds how throughput scales
+with the number of workers. Results are written as JSON; with
+--baseline they are compared against an earlier run and the exit code is 1 when
+p95 latency or throughput regressed by more than --tolerance.
+
+Scenarios:
+  * deberta_process: every turn of every conversation posted to /deberta/process
+    with its full history, as stateless clients do;
+  * mistral_invoke: whole conversations posted to /api/mistral/invoke.
+
+Usage:
+    python -m benchmarks.run --concurrency 1,8,32 --requests 300 --output bench.json
+    python -m benchmarks.run --baseline bench.json --output bench-new.json
+    python -m benchmarks.run --workers 1,2,4 --scenarios deberta_process --output scaling.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.conversations import generate_conversations
+from models.mistral_model import format_conversation
+
+SCENARIOS = ("deberta_process", "mistral_invoke")
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile (q in 0-100) of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def _proc_fields(path: str) -> dict:
+    with open(path) as f:
+        fields = (line.split(":", 1) for line in f if ":" in line)
+        return {key: int(value.split()[0]) / 1024 for key, value in fields if value.split() and value.split()[0].isdigit()}
+
+
+def _children(pid: int) -> list:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def memory_mb(pid: int) -> dict:
+    """
+    Memory of `pid` and its worker processes in MB (Linux only; empty elsewhere). RSS
+    counts pages shared by forked workers once per process; PSS splits them between
+    the processes sharing them, so its sum is the real footprint of the group.
+    """
+    memory = {"rss_mb": 0.0, "peak_rss_mb": 0.0, "pss_mb": 0.0}
+    for process in [pid] + _children(pid):
+        try:
+            status = _proc_fields(f"/proc/{process}/status")
+        except OSError:
+            continue
+        memory["rss_mb"] += status.get("VmRSS", 0.0)
+        memory["peak_rss_mb"] += status.get("VmHWM", 0.0)
+        try:
+            memory["pss_mb"] += _proc_fields(f"/proc/{process}/smaps_rollup").get("Pss", 0.0)
+        except OSError:
+            memory.pop("pss_mb", None)
+    return memory if memory["rss_mb"] else {}
+
+
+def build_requests(scenario: str, count: int, seed: int):
+    """(path, json body) pairs for `scenario`, at least `count` of them."""
+    requests = []
+    for conversation in generate_conversations(count, seed=seed):
+        messages = conversation["messages"]
+        if scenario == "deberta_process":
+            for turn, message in enumerate(messages):
+                requests.append(("/deberta/process", {"message": message["text"], "role": message["role"],
+                                                      "history": messages[:turn]}))
+        else:
+            requests.append(("/api/mistral/invoke", {"input": {"conversation": format_conversation(messages),
+                                                               "frequency": conversation["frequency"]}}))
+        if len(requests) >= count:
+            break
+    return requests[:count]
+
+
+async def replay(base_url: str, requests, concurrency: int, timeout: float) -> dict:
+    """Sends `requests` with `concurrency` requests in flight; returns latencies and status counts."""
+    latencies, statuses = [], {}
+    queue = iter(requests)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            for path, body in queue:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(path, json=body)
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = "error"
+                if status == 200:
+                    latencies.append(time.perf_counter() - started)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    result = {"requests": len(requests), "ok": len(latencies), "statuses": statuses, "wall_s": wall,
+              "rps": len(latencies) / wall if wall else 0.0,
+              "rejected": statuses.get("429", 0) + statuses.get("503", 0)}
+    if latencies:
+        result.update({f"p{q}_ms": percentile(latencies, q) * 1000 for q in (50, 95, 99)})
+        result["mean_ms"] = sum(latencies) / len(latencies) * 1000
+    return result
+
+
+def _start(args, env=None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m"] + args, cwd=_ROOT, env=env)
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f}s")
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Per-scenario changes vs `baseline`; a regression is p95 or rps worse by more than `tolerance`."""
+    report, regressions = {}, []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous or "p95_ms" not in current or "p95_ms" not in previous:
+            continue
+        p95_change = current["p95_ms"] / previous["p95_ms"] - 1
+        rps_change = current["rps"] / previous["rps"] - 1 if previous["rps"] else 0.0
+        report[name] = {"p95_change": p95_change, "rps_change": rps_change}
+        if p95_change > tolerance or rps_change < -tolerance:
+            regressions.append(name)
+    return report, regressions
+
+
+def scaling(results: dict, worker_counts) -> dict:
+    """Throughput of each scenario@concurrency per worker count, relative to the first worker count."""
+    report = {}
+    base_workers = worker_counts[0]
+    for name, result in results["scenarios"].items():
+        label, _, workers = name.rpartition("@w")
+        if int(workers) != base_workers:
+            continue
+        entry = report[label] = {}
+        for count in worker_counts:
+            current = results["scenarios"].get(f"{label}@w{count}")
+            if current is None or not result["rps"]:
+                continue
+            speedup = current["rps"] / result["rps"]
+            entry[str(count)] = {"rps": current["rps"], "speedup": speedup,
+                                 "efficiency": speedup * base_workers / count, "pss_mb": current.get("pss_mb")}
+    return report
+
+
+def run(scenarios, concurrencies, requests: int, seed: int, warmup: int, timeout: float,
+        server_url: str = None, port: int = 8090, ollama_port: int = 11500, fake_ollama_args=None,
+        startup_timeout: float = 900.0, workers: int = None) -> dict:
+    processes, server = [], None
+    try:
+        if server_url is None:
+            ollama = _start(["benchmarks.fake_ollama", "--port", str(ollama_port)] + list(fake_ollama_args or []))
+            processes.append(ollama)
+            _wait_ready(f"http://127.0.0.1:{ollama_port}/api/version", ollama, 60.0)
+            env = {**os.environ, "SAFECHATTER_OLLAMA_BASE_URL": f"http://127.0.0.1:{ollama_port}"}
+            if workers is None:
+                server = _start(["uvicorn", "api.app:app", "--host", "127.0.0.1", "--port", str(port),
+                                 "--log-level", "warning"], env=env)
+            else:
+                server = _start(["api.serve", "--host", "127.0.0.1", "--port", str(port),
+                                 "--workers", str(workers), "--log-level", "warning"], env=env)
+            processes.append(server)
+            server_url = f"http://127.0.0.1:{port}"
+            _wait_ready(f"{server_url}/readyz", server, startup_timeout)
+
+        results = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                            "platform": platform.platform(), "cpu_count": os.cpu_count(), "seed": seed,
+                            "requests": requests, "fake_ollama_args": list(fake_ollama_args or []),
+                            "workers": workers},
+                   "scenarios": {}}
+        for scenario in scenarios:
+            # Warm up with a different seed so measured requests are not cache hits
+            if warmup:
+                asyncio.run(replay(server_url, build_requests(scenario, warmup, seed + 1000), 1, timeout))
+            workload = build_requests(scenario, requests, seed)
+            for concurrency in concurrencies:
+                name = f"{scenario}@c{concurrency}" + (f"@w{workers}" if workers is not None else "")
+                result = asyncio.run(replay(server_url, workload, concurrency, timeout))
+                if server is not None:
+                    result.update(memory_mb(server.pid))
+                results["scenarios"][name] = result
+                print(f"{name}: {result.get('p50_ms', 0):.1f}/{result.get('p95_ms', 0):.1f}/"
+                      f"{result.get('p99_ms', 0):.1f} ms p50/p95/p99, {result['rps']:.1f} rps, "
+                      f"{result['rejected']} rejected, rss {result.get('rss_mb', 0):.0f} MB, "
+                      f"pss {result.get('pss_mb', 0):.0f} MB", flush=True)
+                # Later concurrencies reuse the workload, so start each one from a different seed
+                seed += 1
+                workload = build_requests(scenario, requests, seed)
+        return results
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API server against a fake Ollama.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {SCENARIOS}.")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per scenario and concurrency level.")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client timeout per request in seconds.")
+    parser.add_argument("--server-url", help="Benchmark an already running server instead of starting one.")
+    parser.add_argument("--workers", help="Comma-separated worker counts; serves through api.serve at each one "
+                                          "and reports throughput scaling.")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--ollama-port", type=int, default=11500)
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="Fake Ollama prompt processing delay.")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="Fake Ollama delay per generated token.")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--output", default="benchmark.json", help="Where to write the JSON results.")
+    parser.add_argument("--baseline", help="Earlier results to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative p95/rps regression.")
+    args = parser.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {sorted(unknown)}")
+    fake_ollama_args = ["--first-token-ms", str(args.first_token_ms), "--token-ms", str(args.token_ms),
+                        "--jitter-ms", str(args.jitter_ms), "--seed", str(args.seed)]
+    if args.workers and args.server_url:
+        parser.error("--workers starts its own servers and cannot be combined with --server-url")
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+    if not args.workers:
+        results = run(scenarios, concurrencies, args.requests, args.seed, args.warmup, args.timeout,
+                      server_url=args.server_url, port=args.port, ollama_port=args.ollama_port,
+                      fake_ollama_args=fake_ollama_args)
+    else:
+        worker_counts = [int(w) for w in args.workers.split(",")]
+        results = None
+        for workers in worker_counts:
+            current = run(scenarios, concurrencies, args.requests, args.seed, args.warmup, args.timeout,
+                          port=args.port, ollama_port=args.ollama_port, fake_ollama_args=fake_ollama_args,
+                          workers=workers)
+            if results is None:
+                results = current
+                results["meta"]["workers"] = worker_counts
+            else:
+                results["scenarios"].update(current["scenarios"])
+        results["scaling"] = scaling(results, worker_counts)
+        for label, entries in results["scaling"].items():
+            print(f"{label}: " + ", ".join(f"{count} workers {entry['rps']:.1f} rps (x{entry['speedup']:.2f}, "
+                                           f"{entry['efficiency']:.0%} efficient)" for count, entry in entries.items()))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            report, regressions = compare(results, json.load(f), args.tolerance)
+        results["comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance,
+                                 "scenarios": report, "regressions": regressions}
+        for name, change in report.items():
+            flag = "  REGRESSION" if name in regressions else ""
+            print(f"{name}: p95 {change['p95_change']:+.1%}, rps {change['rps_change']:+.1%}{flag}")
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 class ChatMessage(BaseModel):
     """Represents a single message in the conversation history."""
@@ -11,6 +11,8 @@ class DebertaRequest(BaseModel):
     message: str = Field(..., description="The new message to process.")
     role: str = Field(..., description="The role of the sender (e.g., 'user' or 'agent').")
     history: List[ChatMessage] = Field([], description="The previous messages in the conversation.")
+    model: str = Field("default", description="Name of the DeBERTa model variant to use.")
+    conversation_id: Optional[str] = Field(None, description="Unique id of the conversation (e.g. a UUID); only conversations sent with one are escalated to Mistral in the background.")
 
 class DebertaResponse(BaseModel):
     """Defines the structured JSON response from the Deberta agent."""
@@ -18,6 +20,46 @@ class DebertaResponse(BaseModel):
     scores: List[Dict]
     inference_time: float
     updated_history: List[ChatMessage]
+    frequency: Optional[int] = Field(None, description="How often the conversation's opening message has been seen.")
+    context: Optional[Dict] = Field(None, description="Messages and tokens of the scored context window, and whether it was truncated.")
+    conversation_id: Optional[str] = None
+    escalation: Optional[Dict] = Field(None, description="Background Mistral escalation of the conversation: status, rule and lane (see GET /escalations/{conversation_id}).")
+
+class DebertaSessionCreateRequest(BaseModel):
+    """Opens a server-side conversation session."""
+    model: str = Field("default", description="Name of the DeBERTa model variant to use.")
+
+class DebertaSessionCreateResponse(BaseModel):
+    session_id: str
+
+class DebertaSessionMessageRequest(BaseModel):
+    """Only the new message is sent; the server keeps the history."""
+    message: str = Field(..., description="The new message to process.")
+    role: str = Field(..., description="The role of the sender (e.g., 'user' or 'agent').")
+
+class DebertaSessionMessageResponse(BaseModel):
+    """The delta for one message: its scores and the message appended to the session."""
+    session_id: str
+    display_html: str
+    scores: List[Dict]
+    inference_time: float
+    message: Optional[ChatMessage] = None
+    turn: int
+    frequency: Optional[int] = Field(None, description="How often the conversation's opening message has been seen.")
+    context: Optional[Dict] = Field(None, description="Messages and tokens of the scored context window, and whether it was truncated.")
+    risk: Optional[List[Dict]] = Field(None, description="Session-level generic scores accumulated over every turn (incremental scoring mode only).")
+    tactics: Optional[Dict] = Field(None, description="Evidence per tactic flagged so far: flagged turns, peak score and last flagged turn (incremental scoring mode only).")
+    escalation: Optional[Dict] = Field(None, description="Background Mistral escalation of the session: status, rule and lane (see GET /escalations/{session_id}).")
+
+class DebertaStreamFrame(BaseModel):
+    """A client frame of the /deberta/ws channel."""
+    type: str = Field("message", description="'message' to score a new message, 'ping' or 'pong'.")
+    message: Optional[str] = Field(None, description="The new message to process.")
+    role: Optional[str] = Field(None, description="The role of the sender (e.g., 'user' or 'agent').")
+    id: Optional[str] = Field(None, description="Client reference echoed in the frames answering this one.")
+
+class DebertaResetRequest(BaseModel):
+    session_id: Optional[str] = Field(None, description="Session to free; omit for stateless clients.")
 
 class DebertaResetResponse(BaseModel):
     status: str
@@ -1,11 +1,34 @@
-from typing import List
+from typing import Dict, List, Optional
 from enum import Enum
 from pydantic import BaseModel, Field
 
 # Input Schema
 class ConversationInput(BaseModel):
     conversation: str
-    frequency: int
+    # Filled from the server's starter-message frequency index when omitted
+    frequency: Optional[int] = None
+
+class SessionMessage(BaseModel):
+    role: str
+    text: str
+
+class MistralSessionCreateResponse(BaseModel):
+    session_id: str
+
+class MistralSessionAnalyzeRequest(BaseModel):
+    """New turns of a server-side Mistral session; earlier turns are never resent."""
+    messages: List[SessionMessage] = Field([], description="Turns added since the last call.")
+    frequency: Optional[int] = Field(None, description="Filled from the starter-message frequency index when omitted.")
+    signals: Optional[List[List[str]]] = Field(None, description="Flagged labels per new turn (e.g. from DeBERTa); "
+                                                                 "regex signals are used when omitted.")
+
+class MistralSessionVerdictResponse(BaseModel):
+    session_id: str
+    verdict: Dict
+    turns: int
+    turns_included: int = Field(..., description="Turns sent verbatim to the model.")
+    turns_condensed: int = Field(..., description="Turns folded into the rolling summary.")
+    transcript_tokens: int
 
 # Output Schema
 class ScamTactic(str, Enum):
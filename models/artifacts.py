@@ -0,0 +1,40 @@
+import os
+import shutil
+
+from utils.constants import Constants
+
+_MARKER = "prepared.ok"
+
+
+def artifact_path(model_name: str, kind: str, cache_dir: str = Constants.MODEL_ARTIFACT_DIR):
+    """Local directory of the prepared `kind` artifact of `model_name`, or None when disk caching is off."""
+    if not cache_dir:
+        return None
+    return os.path.join(os.path.expanduser(cache_dir), kind, model_name.replace("/", "--"))
+
+
+def prepared_path(model_name: str, kind: str, cache_dir: str = Constants.MODEL_ARTIFACT_DIR):
+    """The prepared artifact directory if a complete one exists on disk."""
+    path = artifact_path(model_name, kind, cache_dir)
+    if path and os.path.exists(os.path.join(path, _MARKER)):
+        return path
+    return None
+
+
+def save_prepared(model, tokenizer, model_name: str, kind: str, cache_dir: str = Constants.MODEL_ARTIFACT_DIR):
+    """
+    Saves a loaded model and tokenizer (safetensors weights) for later cold starts. The
+    directory is written under a temporary name and renamed when complete, so a crash
+    mid-write never leaves a half-prepared artifact behind.
+    """
+    path = artifact_path(model_name, kind, cache_dir)
+    if not path or os.path.exists(os.path.join(path, _MARKER)):
+        return path
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    model.save_pretrained(tmp_path, safe_serialization=True)
+    tokenizer.save_pretrained(tmp_path)
+    open(os.path.join(tmp_path, _MARKER), "w").close()
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
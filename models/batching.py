@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+from models.deberta_model import MODEL_INTENT_LABELS
+from utils.constants import Constants
+from utils.metrics import REGISTRY
+from utils.score_cache import cache_key
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+QUEUE_WAIT_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+
+
+class DebertaBatchScheduler:
+    """
+    Dynamic micro-batching in front of a shared scoring backend.
+
+    Concurrent callers await `score(text, labels)`; a background task collects pending
+    requests until `max_batch_size` is reached or `max_wait_ms` has passed since the
+    first one arrived, scores them together in one `scorer.score_requests` call and
+    resolves each caller's future with its own slice of scores.
+
+    With a `cache` (utils.score_cache.ScoreCache), cached requests are answered without
+    queueing and identical requests within a batch are scored once.
+    """
+
+    def __init__(self, scorer, candidate_labels=None, max_batch_size: int = Constants.DEBERTA_MAX_BATCH_SIZE,
+                 max_wait_ms: float = Constants.DEBERTA_MAX_BATCH_WAIT_MS, executor=None, cache=None,
+                 model_name: str = ""):
+        self.scorer = scorer
+        self.cache = cache
+        self.model_name = model_name
+        self.candidate_labels = list(candidate_labels or MODEL_INTENT_LABELS)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self.batch_size_hist = REGISTRY.histogram("deberta_batch_size", BATCH_SIZE_BUCKETS, "Texts per forward batch",
+                                                  model=model_name)
+        self.queue_wait_hist = REGISTRY.histogram("deberta_batch_queue_wait_seconds", QUEUE_WAIT_BUCKETS,
+                                                  "Time a text waited before its batch started", model=model_name)
+        REGISTRY.gauge("deberta_batch_queue_depth", "Texts waiting for a batch", model=model_name,
+                       fn=lambda: self._queue.qsize() if self._queue is not None else 0)
+        self._queue = None
+        self._worker = None
+
+    def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batch scheduler stopped"))
+
+    async def score(self, text: str, candidate_labels=None) -> dict:
+        """Queues `text` for the next batch and returns its label -> score map."""
+        request = (text, tuple(candidate_labels or self.candidate_labels))
+        key = None
+        if self.cache is not None:
+            key = cache_key(text, self.model_name, request[1])
+            scores = self.cache.get(key)
+            if scores is not None:
+                return scores
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((request, time.monotonic(), future))
+        scores = await future
+        if key is not None:
+            self.cache.put(key, scores)
+        return scores
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Drop callers that gave up while waiting
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                continue
+            started = time.monotonic()
+            for _, enqueued, _ in batch:
+                self.queue_wait_hist.observe(started - enqueued)
+            self.batch_size_hist.observe(len(batch))
+
+            # Bulk-sent openers often arrive together; score each distinct request once
+            requests = list(dict.fromkeys(request for request, _, _ in batch))
+            try:
+                results = await loop.run_in_executor(self.executor, self.scorer.score_requests, requests)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            scores_by_request = dict(zip(requests, results))
+            for request, _, future in batch:
+                if not future.done():
+                    future.set_result(dict(scores_by_request[request]))
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_size_hist.snapshot(),
+            "queue_wait_seconds": self.queue_wait_hist.snapshot(),
+        }
@@ -1,69 +1,499 @@
-import pandas as pd
-from transformers import pipeline
+import asyncio
+import numpy as np
 import time
 
+from models.artifacts import prepared_path, save_prepared
+from models.risk import ConversationRiskAggregator
 from utils.constants import Constants
+from utils.metrics import REGISTRY, stage_timer
+from utils.score_cache import cache_key
+from utils.taxonomy import Taxonomy
 
-INTENT_LABELS_GENERIC = sorted(list(set(Constants.DEBERTA_INTENT_MAPPING.values())))
-MODEL_INTENT_LABELS = sorted(list(set(Constants.DEBERTA_INTENT_MAPPING.keys())))
+# Set SAFECHATTER_TAXONOMY to a JSON config (see Taxonomy.from_config) to use another taxonomy
+TAXONOMY = (Taxonomy.from_config(Constants.DEBERTA_TAXONOMY_PATH) if Constants.DEBERTA_TAXONOMY_PATH
+            else Taxonomy(Constants.DEBERTA_INTENT_MAPPING, Constants.DEBERTA_GROUP_REPRESENTATIVES))
+INTENT_LABELS_GENERIC = TAXONOMY.generic_labels
+MODEL_INTENT_LABELS = TAXONOMY.fine_labels
+
+def aggregate_generic_scores(scores_map: dict) -> dict:
+    """Max-reduces fine-grained label scores into their generic labels."""
+    return TAXONOMY.aggregate_maps([scores_map])[0]
+
+def empty_scores(taxonomy: Taxonomy = TAXONOMY) -> list:
+    return [{"Label": label, "Score": 0.0} for label in taxonomy.generic_labels]
+
+class LabelCascade:
+    """
+    Hierarchical label selection for zero-shot scoring.
+
+    The first stage scores one representative hypothesis per generic group. A group's
+    remaining fine-grained hypotheses are scored only when its representative reaches
+    `gate`, and nothing is expanded when the "Benign" hypothesis beats every other
+    representative by at least `benign_margin`. Unexpanded groups keep their
+    representative's score.
+    """
+
+    def __init__(self, mapping: dict = None, representatives: dict = None,
+                 gate: float = Constants.DEBERTA_CASCADE_GATE, benign_margin: float = Constants.DEBERTA_CASCADE_BENIGN_MARGIN,
+                 benign_label: str = None, taxonomy: Taxonomy = None):
+        taxonomy = taxonomy or TAXONOMY
+        mapping = mapping or taxonomy.mapping
+        representatives = representatives or taxonomy.representatives
+        self.gate = gate
+        self.benign_margin = benign_margin
+        self.benign_label = benign_label or representatives.get(taxonomy.benign_group, "Benign")
+        self.first_stage_labels = sorted(representatives[group] for group in set(mapping.values()))
+        self.group_of = {rep: group for group, rep in representatives.items()}
+        self.rest_of_group = {
+            group: sorted(fine for fine, g in mapping.items() if g == group and fine != representatives[group])
+            for group in set(mapping.values())
+        }
+
+    def expansion(self, first_stage_scores: dict) -> list:
+        """Fine-grained labels still to score, given the first-stage scores."""
+        others = [score for label, score in first_stage_scores.items() if label != self.benign_label]
+        benign = first_stage_scores.get(self.benign_label, 0.0)
+        if others and benign - max(others) >= self.benign_margin:
+            return []
+        labels = []
+        for rep, score in first_stage_scores.items():
+            if rep != self.benign_label and score >= self.gate:
+                labels.extend(self.rest_of_group[self.group_of[rep]])
+        return sorted(labels)
+
+_TOKENS = REGISTRY.counter("deberta_tokens_total", "Premise/hypothesis tokens run through the NLI model")
+_PADDED_TOKENS = REGISTRY.counter("deberta_padded_tokens_total", "Tokens run through the NLI model, padding included")
+
+# Same default hypothesis template as the transformers zero-shot pipeline
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+def load_zero_shot_classifier(model_name: str):
+    """
+    Builds the transformers zero-shot pipeline for `model_name`, from the prepared
+    on-disk artifact when there is one (no hub round-trips), saving it otherwise.
+    """
+    # Imported here so that importing this module (and the API) stays fast
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    path = prepared_path(model_name, "zero-shot")
+    if path is not None:
+        model = AutoModelForSequenceClassification.from_pretrained(path, local_files_only=True)
+        tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+        return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+    classifier = pipeline("zero-shot-classification", model=model_name)
+    save_prepared(classifier.model, classifier.tokenizer, model_name, "zero-shot")
+    return classifier
+
+class TokenizedText(str):
+    """A model input string carrying its token IDs (no special tokens), so scoring never re-tokenizes it."""
+
+    def __new__(cls, text: str, input_ids):
+        obj = super().__new__(cls, text)
+        obj.input_ids = input_ids
+        return obj
+
+    def __getnewargs__(self):
+        return str(self), self.input_ids
+
+_HYPOTHESIS_IDS = {}
+
+def hypothesis_ids(tokenizer, hypothesis: str) -> list:
+    """Token IDs of a hypothesis, encoded once per process and tokenizer."""
+    key = (tokenizer.name_or_path, hypothesis)
+    ids = _HYPOTHESIS_IDS.get(key)
+    if ids is None:
+        ids = _HYPOTHESIS_IDS[key] = tokenizer.encode(hypothesis, add_special_tokens=False)
+    return ids
+
+def max_sequence_tokens(tokenizer) -> int:
+    return min(tokenizer.model_max_length, Constants.DEBERTA_MAX_SEQUENCE_TOKENS)
+
+def premise_token_budget(tokenizer, labels=None, hypothesis_template: str = HYPOTHESIS_TEMPLATE) -> int:
+    """Premise tokens that fit next to the longest hypothesis of `labels` in one sequence."""
+    labels = labels or MODEL_INTENT_LABELS
+    longest = max(len(hypothesis_ids(tokenizer, hypothesis_template.format(label))) for label in labels)
+    return max_sequence_tokens(tokenizer) - tokenizer.num_special_tokens_to_add(pair=True) - longest
+
+def score_nli_pairs(tokenizer, forward, entailment_id: int, requests, return_tensors: str = "pt",
+                    hypothesis_template: str = HYPOTHESIS_TEMPLATE, max_pairs_per_pass: int = 256):
+    """
+    Multi-label zero-shot scoring of several (sequence, candidate_labels) requests at once.
+
+    Each premise is tokenized once (never for TokenizedText, which carries its IDs) and
+    hypotheses come from the per-process cache; pairs are assembled from the IDs, sorted
+    by length and run through `forward` (padded features -> array of NLI logits) in
+    chunks of at most `max_pairs_per_pass` pairs, so similarly sized pairs share a
+    forward pass. Scores match the zero-shot pipeline with multi_label=True, except that
+    over-long premises lose their oldest tokens rather than their newest. Returns one
+    label -> score dict per request.
+    """
+    if not any(labels for _, labels in requests):
+        return [{} for _ in requests]
+    with stage_timer("deberta.tokenize"):
+        encoded = _encode_pairs(tokenizer, requests, hypothesis_template)
+
+    num_pairs = len(encoded["input_ids"])
+    order = sorted(range(num_pairs), key=lambda i: len(encoded["input_ids"][i]))
+    contradiction_id = -1 if entailment_id == 0 else 0
+    probs = [0.0] * num_pairs
+    for start in range(0, len(order), max_pairs_per_pass):
+        chunk = order[start:start + max_pairs_per_pass]
+        with stage_timer("deberta.pad"):
+            features = tokenizer.pad({key: [encoded[key][i] for i in chunk] for key in encoded.keys()},
+                                     return_tensors=return_tensors)
+        with stage_timer("deberta.forward"):
+            logits = np.asarray(forward(features))[:, [contradiction_id, entailment_id]]
+        _TOKENS.inc(sum(len(encoded["input_ids"][i]) for i in chunk))
+        _PADDED_TOKENS.inc(int(np.prod(features["input_ids"].shape)))
+        logits = np.exp(logits - logits.max(axis=1, keepdims=True))
+        entail_probs = logits[:, 1] / logits.sum(axis=1)
+        for i, prob in zip(chunk, entail_probs.tolist()):
+            probs[i] = prob
+
+    results, offset = [], 0
+    for _, labels in requests:
+        results.append(dict(zip(labels, probs[offset:offset + len(labels)])))
+        offset += len(labels)
+    return results
+
+def _encode_pairs(tokenizer, requests, hypothesis_template: str) -> dict:
+    """Unpadded pair features of every (premise, hypothesis) pair, premise kept to fit the sequence length."""
+    plain = sorted({seq for seq, _ in requests if getattr(seq, "input_ids", None) is None})
+    plain_ids = dict(zip(plain, tokenizer(plain, add_special_tokens=False)["input_ids"])) if plain else {}
+    with_token_types = "token_type_ids" in tokenizer.model_input_names
+    room = max_sequence_tokens(tokenizer) - tokenizer.num_special_tokens_to_add(pair=True)
+
+    encoded = {"input_ids": [], "attention_mask": []}
+    if with_token_types:
+        encoded["token_type_ids"] = []
+    for seq, labels in requests:
+        premise = getattr(seq, "input_ids", None)
+        premise = list(premise) if premise is not None else plain_ids[seq]
+        for label in labels:
+            hypothesis = hypothesis_ids(tokenizer, hypothesis_template.format(label))
+            first = premise[-(room - len(hypothesis)):] if len(premise) + len(hypothesis) > room else premise
+            input_ids = tokenizer.build_inputs_with_special_tokens(first, hypothesis)
+            encoded["input_ids"].append(input_ids)
+            encoded["attention_mask"].append([1] * len(input_ids))
+            if with_token_types:
+                encoded["token_type_ids"].append(tokenizer.create_token_type_ids_from_sequences(first, hypothesis))
+    return encoded
+
+def score_nli_requests(classifier, requests, **kwargs):
+    """Scores (sequence, candidate_labels) requests with a transformers zero-shot pipeline."""
+    import torch
+
+    model = classifier.model
+
+    def forward(features):
+        with torch.no_grad():
+            return model(**features.to(model.device)).logits.float().cpu().numpy()
+
+    return score_nli_pairs(classifier.tokenizer, forward, classifier.entailment_id, requests, **kwargs)
+
+def score_nli_batch(classifier, sequences, candidate_labels, **kwargs):
+    """Scores every sequence against the same candidate labels (see score_nli_requests)."""
+    return score_nli_requests(classifier, [(seq, candidate_labels) for seq in sequences], **kwargs)
+
+class ZeroShotScorer:
+    """Cross-encoder backend: one NLI forward pass per (text, label) pair."""
+
+    backend = "zero-shot"
+
+    def __init__(self, model_name: str, classifier=None):
+        self.model_name = model_name
+        self.classifier = classifier if classifier is not None else load_zero_shot_classifier(model_name)
+        self.tokenizer = self.classifier.tokenizer
+
+    def score_requests(self, requests):
+        return score_nli_requests(self.classifier, requests)
 
 class DebertaConversationAgent:
-    def __init__(self, model_name: str = "MoritzLaurer/deberta-v3-large-zeroshot-v2.0", threshold: float = 0.6, use_context: bool = True, context_window: int = 8):
-        self.classifier = pipeline("zero-shot-classification", model=model_name)
+    def __init__(self, model_name: str = "MoritzLaurer/deberta-v3-large-zeroshot-v2.0", threshold: float = 0.6, use_context: bool = True, context_window: int = None, scorer=None, score_cache=None, label_mode: str = Constants.DEBERTA_LABEL_MODE, context_tokens: int = None, taxonomy: Taxonomy = None, scoring_mode: str = Constants.DEBERTA_SCORING_MODE, prefilter=None):
+        # A shared, already-loaded scoring backend can be injected (see models.registry) so that
+        # per-conversation agents stay cheap to create.
+        self.model_name = model_name
+        self.scorer = scorer if scorer is not None else ZeroShotScorer(model_name)
+        self.score_cache = score_cache
+        self.taxonomy = taxonomy or TAXONOMY
+        # "full" scores all fine-grained hypotheses; "cascade" expands only promising groups
+        self.cascade = LabelCascade(taxonomy=self.taxonomy) if label_mode == "cascade" else None
+        # Optional models.prefilter.MessagePrefilter: texts it does not escalate skip the model
+        self.prefilter = prefilter
         self.threshold = threshold
         self.use_context = use_context
+        # The context is filled with the most recent messages that fit in `context_tokens`
+        # (by default the backend's own `context_tokens` if it has one, else what the longest
+        # NLI hypothesis leaves of the model's sequence length);
+        # `context_window` optionally caps it by message count as well. Backends without a
+        # tokenizer fall back to the last 8 messages.
         self.context_window = context_window
+        # "window" re-scores the recent context with every message; "incremental" scores each
+        # turn once with a tiny local context and accumulates session-level risk instead
+        self.scoring_mode = scoring_mode
+        if scoring_mode == "incremental" and context_window is None:
+            self.context_window = Constants.DEBERTA_INCREMENTAL_CONTEXT + 1
+        self.tokenizer = getattr(self.scorer, "tokenizer", None)
+        self.context_tokens = context_tokens or getattr(self.scorer, "context_tokens", None) or (
+            premise_token_budget(self.tokenizer, self.taxonomy.fine_labels) if self.tokenizer is not None else None)
+        self.last_context = {}
+        self._message_ids = []  # (role, text, token IDs) per chat message, None once out of reach
         self.chat = []
-        self.last_scores_df = pd.DataFrame({"Label": INTENT_LABELS_GENERIC, "Score": [0.0] * len(INTENT_LABELS_GENERIC)})
+        # Generic scores of the last message as [{"Label", "Score"}, ...], highest first
+        self.last_scores = empty_scores(self.taxonomy)
+        self.risk = ConversationRiskAggregator(self.taxonomy, threshold=threshold) if scoring_mode == "incremental" else None
 
     def reset(self):
         self.chat.clear()
-        self.last_scores_df = pd.DataFrame({"Label": INTENT_LABELS_GENERIC, "Score": [0.0] * len(INTENT_LABELS_GENERIC)})
+        self._message_ids.clear()
+        self.last_context = {}
+        self.last_scores = empty_scores(self.taxonomy)
+        if self.risk is not None:
+            self.risk.reset()
+
+    def risk_scores(self):
+        """Session-level scores accumulated over every turn (incremental mode only, else None)."""
+        return self.risk.scores() if self.risk is not None else None
+
+    def risk_tactics(self):
+        """Per flagged generic label: flagged turns, peak score and last flagged turn (incremental mode only, else None)."""
+        return self.risk.tactics() if self.risk is not None else None
 
     def _build_context(self) -> str:
-        history = self.chat[-self.context_window:]
-        lines = [f"{m['role']}: {m['text']}" for m in history]
-        return "\n".join(lines)
+        if self.tokenizer is None:
+            history = self.chat[-(self.context_window or 8):]
+            self.last_context = {"messages": len(history), "dropped_messages": len(self.chat) - len(history)}
+            return "\n".join(f"{m['role']}: {m['text']}" for m in history)
+        return self._build_token_context()
+
+    def _ids_of(self, index: int) -> list:
+        """Token IDs of chat message `index`, tokenized only the first time it is needed."""
+        message = self.chat[index]
+        del self._message_ids[len(self.chat):]
+        self._message_ids.extend([None] * (len(self.chat) - len(self._message_ids)))
+        cached = self._message_ids[index]
+        # The chat may be replaced wholesale (stateless requests), so check the message too
+        if cached is None or cached[0] != message["role"] or cached[1] != message["text"]:
+            ids = self.tokenizer.encode(f"{message['role']}: {message['text']}", add_special_tokens=False)
+            cached = self._message_ids[index] = (message["role"], message["text"], ids)
+        return cached[2]
+
+    def _build_token_context(self) -> TokenizedText:
+        """
+        Fills the token budget with the most recent messages, newest first. Messages are
+        never cut except the newest one when it alone exceeds the budget, in which case
+        its oldest tokens are dropped; both cases are reported in `last_context`.
+        """
+        first = len(self.chat) - 1
+        if self.context_window:
+            oldest = max(0, len(self.chat) - self.context_window)
+        else:
+            oldest = 0
+        segments = [self._ids_of(first)]
+        used = len(segments[0])
+        while first > oldest:
+            ids = self._ids_of(first - 1)
+            if used + len(ids) > self.context_tokens:
+                break
+            segments.append(ids)
+            used += len(ids)
+            first -= 1
+        # The window only ever moves forward, so older messages will not be tokenized again
+        for index in range(first):
+            self._message_ids[index] = None
+
+        truncated = used > self.context_tokens
+        lines = [f"{m['role']}: {m['text']}" for m in self.chat[first:]]
+        if truncated:
+            segments[0] = segments[0][len(segments[0]) - self.context_tokens:]
+            lines[-1] = self.tokenizer.decode(segments[0])
+            used = self.context_tokens
+        input_ids = [token for ids in reversed(segments) for token in ids]
+        self.last_context = {"messages": len(self.chat) - first, "dropped_messages": first,
+                             "tokens": used, "budget_tokens": self.context_tokens, "truncated": truncated}
+        return TokenizedText("\n".join(lines), input_ids)
+
+    def _prepare(self, message: str, role: str):
+        """Appends the message to the chat and returns the text the model should score."""
+        self.chat.append({"role": role, "text": message})
+        if not self.use_context:
+            return message
+        with stage_timer("deberta.context"):
+            return self._build_context()
+
+    def _rollback(self):
+        """Undoes _prepare when the message could not be scored, so a retry does not store it twice."""
+        self.chat.pop()
+
+    def _score_requests(self, requests):
+        """
+        Scores (text, labels) requests. Requests found in the score cache skip the model;
+        the rest share a single batched forward pass.
+        """
+        if self.score_cache is None:
+            return self.scorer.score_requests(requests)
+
+        keys = [cache_key(text, self.model_name, labels) for text, labels in requests]
+        results = [self.score_cache.get(key) for key in keys]
+        missing = [i for i, scores in enumerate(results) if scores is None]
+        for i, scores in zip(missing, self.scorer.score_requests([requests[i] for i in missing])):
+            self.score_cache.put(keys[i], scores)
+            results[i] = scores
+        return results
+
+    def _skipped_scores(self, probability: float) -> dict:
+        """Stand-in fine-label scores of a text the prefilter did not escalate: benign, nothing else."""
+        benign = self.taxonomy.representatives.get(self.taxonomy.benign_group)
+        return {benign: 1.0 - float(probability)} if benign is not None else {}
+
+    def score_texts(self, texts):
+        """
+        Scores each text against the taxonomy's fine labels, or through the label cascade if
+        enabled; with a prefilter, only the texts it escalates reach the model.
+        """
+        if self.prefilter is None:
+            return self._score_model_texts(texts)
+        with stage_timer("deberta.prefilter"):
+            escalated, probabilities = self.prefilter.escalate(texts)
+        scored = iter(self._score_model_texts([text for text, escalate in zip(texts, escalated) if escalate]))
+        return [next(scored) if escalate else self._skipped_scores(probability)
+                for escalate, probability in zip(escalated, probabilities)]
+
+    def _score_model_texts(self, texts):
+        if not texts:
+            return []
+        if self.cascade is None:
+            return self._score_requests([(text, self.taxonomy.fine_labels) for text in texts])
+
+        first_stage = self._score_requests([(text, self.cascade.first_stage_labels) for text in texts])
+        expansions = [self.cascade.expansion(scores) for scores in first_stage]
+        second_stage = self._score_requests([(text, labels) for text, labels in zip(texts, expansions) if labels])
+        second_stage = iter(second_stage)
+        return [{**scores, **next(second_stage)} if labels else scores
+                for scores, labels in zip(first_stage, expansions)]
+
+    async def _ascore_text(self, text: str, score_fn, executor=None) -> dict:
+        if self.prefilter is not None:
+            # Hashing and the linear model are CPU work too: keep them off the event loop
+            with stage_timer("deberta.prefilter"):
+                escalated, probabilities = await asyncio.get_running_loop().run_in_executor(
+                    executor, self.prefilter.escalate, [text])
+            if not escalated[0]:
+                return self._skipped_scores(probabilities[0])
+        if self.cascade is None:
+            return await score_fn(text, self.taxonomy.fine_labels)
+        scores = await score_fn(text, self.cascade.first_stage_labels)
+        expansion = self.cascade.expansion(scores)
+        if expansion:
+            scores.update(await score_fn(text, expansion))
+        return scores
 
     def process_message(self, message: str, role: str):
         message = (message or "").strip()
         if not message:
-            return "[empty message ignored]", self.last_scores_df, 0.0
+            return "[empty message ignored]", self.last_scores, 0.0
 
-        self.chat.append({"role": role, "text": message})
-        
-        text_for_model = self._build_context() if self.use_context else message
+        text_for_model = self._prepare(message, role)
         
         start_time = time.time()
 
-        
-        result = self.classifier(text_for_model,
-                                 candidate_labels=MODEL_INTENT_LABELS, 
-                                 multi_label=True)
+        try:
+            with stage_timer("deberta.score"):
+                scores_map = self.score_texts([text_for_model])[0]
+        except BaseException:
+            self._rollback()
+            raise
         
         elapsed = (time.time() - start_time)
-        
-        scores_map = {lab: sc for lab, sc in zip(result["labels"], result["scores"])}
-        generic_scores = {}
-        for fine, generic in Constants.DEBERTA_INTENT_MAPPING.items():
-            score = scores_map.get(fine, 0.0)
-            if generic not in generic_scores:
-                generic_scores[generic] = score
-            else:
-                generic_scores[generic] = max(generic_scores[generic], score)
-        
-        df = pd.DataFrame({
-            "Label": INTENT_LABELS_GENERIC,
-            "Score": [float(f"{generic_scores.get(lab, 0.0):.3f}") for lab in INTENT_LABELS_GENERIC]
-        }).sort_values(by=["Score"], ascending=False)
-        self.last_scores_df = df
+        return self._finalize(message, scores_map, elapsed)
 
-        flagged = [f"{row['Label']} ({row['Score']:.2f})" for index, row in df.iterrows() if row['Score'] > self.threshold and row['Label'] != 'Genuinity']
-        
-        
-        if flagged:
-            status = f"<br><span style='font-size:12px; color:yellow;'>⚠️ Potential signals: {', '.join(flagged)}</span>"
+    async def aprocess_message(self, message: str, role: str, score_fn, executor=None):
+        """
+        Async variant of process_message. `score_fn` is an awaitable taking the model
+        input text and candidate labels and returning their label -> score map
+        (e.g. DebertaBatchScheduler.score); the prefilter, if any, runs in `executor`
+        (the loop's default executor when None).
+        """
+        message = (message or "").strip()
+        if not message:
+            return "[empty message ignored]", self.last_scores, 0.0
+
+        text_for_model = self._prepare(message, role)
+
+        start_time = time.time()
+        try:
+            with stage_timer("deberta.score"):
+                scores_map = await self._ascore_text(text_for_model, score_fn, executor)
+        except BaseException:
+            # Includes the cancellation by an expired admission deadline
+            self._rollback()
+            raise
+        elapsed = (time.time() - start_time)
+        return self._finalize(message, scores_map, elapsed)
+
+    def _finalize(self, message: str, scores_map: dict, elapsed: float):
+        return finalize_batch([self], [message], [scores_map], elapsed)[0]
+
+def _display(message: str, flagged: list) -> str:
+    if flagged:
+        status = f"<br><span style='font-size:12px; color:yellow;'>⚠️ Potential signals: {', '.join(flagged)}</span>"
+    else:
+        status = "<br><span style='font-size:12px; color:greem;'>✅ No strong scam signals</span>"
+    return f"{message}{status}"
+
+def finalize_batch(agents, messages, scores_maps, elapsed: float):
+    """
+    Turns the fine-label scores of one message per agent into (display, scores, elapsed)
+    results. Aggregation, rounding, thresholding and ranking run once over the whole
+    batch; `scores` is a list of {"Label", "Score"} dicts, highest score first. The
+    agents must share a taxonomy. Agents in incremental mode also add the message's
+    generic scores to their conversation risk.
+    """
+    taxonomy = agents[0].taxonomy
+    with stage_timer("deberta.aggregate"):
+        generic = np.round(taxonomy.aggregate(taxonomy.score_matrix(scores_maps)), 3)
+        order = taxonomy.rank(generic)
+        thresholds = np.array([[agent.threshold] for agent in agents])
+        flags = taxonomy.flags(generic, thresholds)
+
+    with stage_timer("deberta.format"):
+        labels = taxonomy.generic_labels
+        results = []
+        for i, (agent, message, row, row_order, row_flags) in enumerate(zip(agents, messages, generic.tolist(), order.tolist(), flags.tolist())):
+            scores = [{"Label": labels[j], "Score": row[j]} for j in row_order]
+            flagged = [f"{labels[j]} ({row[j]:.2f})" for j in row_order if row_flags[j]]
+            agent.last_scores = scores
+            if agent.risk is not None:
+                agent.risk.update(generic[i], agent.chat[-1]["role"])
+            results.append((_display(message, flagged), scores, elapsed))
+    return results
+
+def process_message_batch(agents, messages):
+    """
+    Processes one new (message, role) pair per agent, scoring all of them in a single
+    batched call. The agents must share a scoring backend (e.g. from models.registry).
+    Returns the process_message result of each agent.
+    """
+    results = [None] * len(agents)
+    pending = []
+    for i, (agent, (message, role)) in enumerate(zip(agents, messages)):
+        message = (message or "").strip()
+        if not message:
+            results[i] = ("[empty message ignored]", agent.last_scores, 0.0)
         else:
-            status = "<br><span style='font-size:12px; color:greem;'>✅ No strong scam signals</span>"
-        display = f"{message}{status}"
-        return display, df, elapsed
\ No newline at end of file
+            pending.append((i, message, agent._prepare(message, role)))
+    if not pending:
+        return results
+
+    start_time = time.time()
+    try:
+        scores = agents[pending[0][0]].score_texts([text for _, _, text in pending])
+    except BaseException:
+        for i, _, _ in pending:
+            agents[i]._rollback()
+        raise
+    elapsed = (time.time() - start_time) / len(pending)
+    finalized = finalize_batch([agents[i] for i, _, _ in pending], [message for _, message, _ in pending], scores, elapsed)
+    for (i, _, _), result in zip(pending, finalized):
+        results[i] = result
+    return results
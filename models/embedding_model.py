@@ -0,0 +1,112 @@
+import json
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+from models.artifacts import prepared_path, save_prepared
+from models.deberta_model import max_sequence_tokens
+from utils.constants import Constants
+from utils.metrics import stage_timer
+
+
+class EmbeddingScorer:
+    """
+    Bi-encoder backend for DebertaConversationAgent.
+
+    Each text is embedded once (mean-pooled, L2-normalized) and compared with label
+    embeddings precomputed from Constants.DEBERTA_INTENT_MAPPING, so a batch of texts
+    against all labels is a single matrix multiplication. Cosine similarities are
+    mapped to [0, 1] with a per-label logistic calibration, score = sigmoid(scale * (sim - bias)).
+    """
+
+    backend = "embedding"
+
+    def __init__(self, model_name: str = Constants.EMBEDDING_MODEL_NAME, labels=None,
+                 calibration_path: str = Constants.EMBEDDING_CALIBRATION_PATH, batch_size: int = 64):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        path = prepared_path(model_name, "embedding")
+        if path is not None:
+            self.tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+            self.model = AutoModel.from_pretrained(path, local_files_only=True).eval()
+        else:
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            self.model = AutoModel.from_pretrained(model_name).eval()
+            save_prepared(self.model, self.tokenizer, model_name, "embedding")
+        # Over-long texts lose their oldest tokens, so the newest message of a context is kept
+        self.tokenizer.truncation_side = "left"
+        self.max_length = max_sequence_tokens(self.tokenizer)
+        # Text tokens per sequence; DebertaConversationAgent sizes its context window with it
+        self.context_tokens = self.max_length - self.tokenizer.num_special_tokens_to_add(pair=False)
+        self.labels = sorted(labels or Constants.DEBERTA_INTENT_MAPPING.keys())
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+        self.label_embeddings = self.embed(self.labels)
+
+        default = Constants.EMBEDDING_CALIBRATION
+        self.scale = np.full(len(self.labels), default["scale"], dtype=np.float32)
+        self.bias = np.full(len(self.labels), default["bias"], dtype=np.float32)
+        if calibration_path:
+            self.load_calibration(calibration_path)
+
+    def embed(self, texts) -> np.ndarray:
+        """Returns an (n_texts, dim) array of L2-normalized mean-pooled embeddings."""
+        chunks = []
+        with torch.no_grad():
+            for start in range(0, len(texts), self.batch_size):
+                with stage_timer("embedding.tokenize"):
+                    features = self.tokenizer(list(texts[start:start + self.batch_size]), padding=True,
+                                              truncation=True, max_length=self.max_length,
+                                              return_tensors="pt").to(self.model.device)
+                with stage_timer("embedding.forward"):
+                    hidden = self.model(**features).last_hidden_state
+                mask = features["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                chunks.append(torch.nn.functional.normalize(pooled, dim=-1).cpu().numpy())
+        return np.concatenate(chunks) if chunks else np.zeros((0, self.label_embeddings.shape[1]), dtype=np.float32)
+
+    def similarities(self, texts) -> np.ndarray:
+        """Cosine similarity of every text with every label, shape (n_texts, n_labels)."""
+        return self.embed(texts) @ self.label_embeddings.T
+
+    def calibrated(self, similarities: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-self.scale * (similarities - self.bias)))
+
+    def score_requests(self, requests):
+        texts = list(dict.fromkeys(text for text, _ in requests))
+        row_of = {text: i for i, text in enumerate(texts)}
+        scores = self.calibrated(self.similarities(texts))
+        return [
+            {label: float(scores[row_of[text], self.label_index[label]]) for label in labels}
+            for text, labels in requests
+        ]
+
+    def fit_calibration(self, texts, targets: dict):
+        """
+        Fits the per-label calibration on labeled texts. `targets` maps a fine label to a
+        list of 0/1 flags aligned with `texts`; labels without targets keep their defaults.
+        """
+        from sklearn.linear_model import LogisticRegression
+
+        similarities = self.similarities(texts)
+        for label, flags in targets.items():
+            flags = np.asarray(flags)
+            if label not in self.label_index or len(set(flags.tolist())) < 2:
+                continue
+            i = self.label_index[label]
+            model = LogisticRegression().fit(similarities[:, i:i + 1], flags)
+            self.scale[i] = model.coef_[0][0]
+            self.bias[i] = -model.intercept_[0] / model.coef_[0][0]
+
+    def save_calibration(self, path: str):
+        with open(path, "w") as f:
+            json.dump({label: {"scale": float(self.scale[i]), "bias": float(self.bias[i])}
+                       for label, i in self.label_index.items()}, f, indent=2)
+
+    def load_calibration(self, path: str):
+        with open(path) as f:
+            calibration = json.load(f)
+        for label, params in calibration.items():
+            if label in self.label_index:
+                self.scale[self.label_index[label]] = params["scale"]
+                self.bias[self.label_index[label]] = params["bias"]
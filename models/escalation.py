@@ -0,0 +1,228 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from models.mistral_model import format_conversation
+from utils.constants import Constants
+from utils.metrics import REGISTRY
+
+QUEUE_WAIT_BUCKETS = [0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0]
+
+
+class EscalationState:
+    """What the escalation manager knows about one conversation."""
+
+    def __init__(self, conversation_id: str):
+        self.conversation_id = conversation_id
+        self.peaks = {}  # generic label -> highest score seen
+        self.turns = 0
+        self.status = "watching"  # watching | pending | running | ready | failed | dropped
+        self.rule = None
+        self.lane = None
+        self.chat = []
+        self.frequency = None
+        self.tactics = None  # DeBERTa's per-tactic evidence (incremental scoring mode)
+        self.due = 0.0
+        self.first_trigger = 0.0
+        self.stale = False  # new turns arrived while the verdict was running
+        self.verdict = None
+        self.verdict_turns = 0
+        self.error = None
+        self.last_access = time.time()
+
+    def summary(self) -> dict:
+        return {"conversation_id": self.conversation_id, "status": self.status, "rule": self.rule,
+                "lane": self.lane, "turns": self.turns, "verdict_turns": self.verdict_turns,
+                "tactics": self.tactics, "verdict": self.verdict, "error": self.error}
+
+
+class EscalationManager:
+    """
+    DeBERTa-gated background escalation to the Mistral verdict.
+
+    `observe()` is called with every scored message. Per conversation it keeps the
+    highest score seen for each generic label; once every label of a rule has reached
+    the rule's threshold the conversation is queued in the rule's lane. A queued
+    conversation waits until it has been quiet for the lane's debounce time (at most
+    `max_delay_s` after it was queued), absorbing new turns meanwhile, so one verdict
+    covers a burst of messages. Due conversations are run highest lane first, oldest
+    first, with at most `concurrency` verdicts in flight (match Ollama's parallelism).
+    Turns arriving during a verdict queue a follow-up one; after a verdict, the
+    conversation is only re-escalated once `refresh_turns` new turns have arrived or
+    it matches a rule of a higher lane.
+
+    Verdicts are kept on the conversation (see `get`) and passed to `on_verdict`.
+    """
+
+    def __init__(self, chain, rules=None, lanes: dict = None, concurrency: int = Constants.ESCALATION_CONCURRENCY,
+                 max_delay_s: float = Constants.ESCALATION_MAX_DELAY_S,
+                 refresh_turns: int = Constants.ESCALATION_REFRESH_TURNS,
+                 max_pending: int = Constants.ESCALATION_MAX_PENDING,
+                 max_conversations: int = Constants.ESCALATION_MAX_CONVERSATIONS,
+                 ttl_seconds: float = Constants.ESCALATION_TTL_S, build_transcript=None, on_verdict=None):
+        self.chain = chain
+        self.rules = list(rules or Constants.ESCALATION_RULES)
+        self.lanes = dict(lanes or Constants.ESCALATION_LANES)
+        self.lane_rank = {lane: rank for rank, lane in enumerate(self.lanes)}
+        self.concurrency = concurrency
+        self.max_delay_s = max_delay_s
+        self.refresh_turns = refresh_turns
+        self.max_pending = max_pending
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        # chat -> conversation text for the prompt (e.g. a token-budgeted transcript); runs in the default executor
+        self.build_transcript = build_transcript or format_conversation
+        self.on_verdict = on_verdict
+        self.running = 0
+        self._states = OrderedDict()
+        self._pending = {}
+        self._tasks = set()
+        self._wake = None
+        self._dispatcher = None
+        self._triggers = {rule["name"]: REGISTRY.counter("escalation_triggers_total", "Conversations queued per rule",
+                                                         rule=rule["name"]) for rule in self.rules}
+        self._outcomes = {outcome: REGISTRY.counter("escalation_verdicts_total", "Escalated verdicts by outcome",
+                                                    outcome=outcome) for outcome in ("ready", "failed", "dropped")}
+        REGISTRY.gauge("escalation_pending", "Conversations waiting for a verdict", fn=lambda: len(self._pending))
+        REGISTRY.gauge("escalation_running", "Escalated verdicts in flight", fn=lambda: self.running)
+        self.queue_wait_hist = REGISTRY.histogram("escalation_queue_wait_seconds", QUEUE_WAIT_BUCKETS,
+                                                  "Time from a conversation's trigger to its verdict starting")
+
+    def start(self):
+        if self._dispatcher is None:
+            self._wake = asyncio.Event()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def stop(self):
+        tasks = list(self._tasks) + ([self._dispatcher] if self._dispatcher is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = None
+
+    def _state(self, conversation_id: str) -> EscalationState:
+        state = self._states.get(conversation_id)
+        if state is None:
+            state = self._states[conversation_id] = EscalationState(conversation_id)
+        self._states.move_to_end(conversation_id)
+        state.last_access = time.time()
+        # Forget the least recently seen conversations, never ones still queued or running
+        for old_id, old in list(self._states.items()):
+            if len(self._states) <= self.max_conversations and time.time() - old.last_access <= self.ttl_seconds:
+                break
+            if old_id != conversation_id and old.status not in ("pending", "running"):
+                del self._states[old_id]
+        return state
+
+    def get(self, conversation_id: str):
+        state = self._states.get(conversation_id)
+        return state.summary() if state is not None else None
+
+    def _matching_rule(self, peaks: dict):
+        """The matched rule of the highest lane, or None."""
+        matched = [rule for rule in self.rules
+                   if all(peaks.get(label, 0.0) >= rule["threshold"] for label in rule["labels"])]
+        return min(matched, key=lambda rule: self.lane_rank[rule["lane"]]) if matched else None
+
+    def observe(self, conversation_id: str, scores: list, chat: list, frequency: int = None,
+                tactics: dict = None) -> dict:
+        """
+        Records the generic scores ([{"Label", "Score"}, ...]) of a conversation's latest
+        message, and optionally its per-tactic evidence (ConversationRiskAggregator.tactics),
+        queues a verdict when a rule matches, and returns the conversation's escalation
+        summary (without the verdict itself).
+        """
+        state = self._state(conversation_id)
+        if tactics is not None:
+            state.tactics = tactics
+        for score in scores:
+            if score["Score"] > state.peaks.get(score["Label"], 0.0):
+                state.peaks[score["Label"]] = score["Score"]
+        state.turns = len(chat)
+        rule = self._matching_rule(state.peaks)
+        if rule is not None:
+            self._trigger(state, rule, chat, frequency)
+        summary = state.summary()
+        summary.pop("verdict")
+        return summary
+
+    def _trigger(self, state: EscalationState, rule: dict, chat: list, frequency):
+        now = time.monotonic()
+        upgrade = state.lane is not None and self.lane_rank[rule["lane"]] < self.lane_rank[state.lane]
+        if state.status in ("ready", "failed", "dropped") and not upgrade \
+                and state.turns - state.verdict_turns < self.refresh_turns:
+            return
+        state.chat, state.frequency = list(chat), frequency
+        if upgrade:
+            state.rule, state.lane = rule["name"], rule["lane"]
+        if state.status == "running":
+            state.stale = True
+            return
+        if state.status != "pending":
+            if len(self._pending) >= self.max_pending and self.lane_rank[rule["lane"]] > 0:
+                # Shed the lower lanes rather than queueing without bound
+                state.status, state.verdict_turns = "dropped", state.turns
+                self._outcomes["dropped"].inc()
+                return
+            state.status, state.first_trigger, state.rule, state.lane = "pending", now, rule["name"], rule["lane"]
+            self._pending[state.conversation_id] = state
+            self._triggers[rule["name"]].inc()
+        state.due = min(now + self.lanes[state.lane]["debounce_s"], state.first_trigger + self.max_delay_s)
+        self.start()
+        self._wake.set()
+
+    async def _dispatch(self):
+        while True:
+            now = time.monotonic()
+            due = [state for state in self._pending.values() if state.due <= now]
+            if due and self.running < self.concurrency:
+                state = min(due, key=lambda s: (self.lane_rank[s.lane], s.first_trigger))
+                del self._pending[state.conversation_id]
+                self.queue_wait_hist.observe(now - state.first_trigger)
+                self.running += 1
+                state.status, state.stale = "running", False
+                task = asyncio.get_running_loop().create_task(self._run(state))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                continue
+            timeout = None
+            if self._pending and self.running < self.concurrency:
+                timeout = max(0.0, min(state.due for state in self._pending.values()) - now)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, state: EscalationState):
+        chat = state.chat
+        try:
+            transcript = await asyncio.get_running_loop().run_in_executor(None, self.build_transcript, chat)
+            verdict = await self.chain.ainvoke({"conversation": transcript, "frequency": state.frequency})
+            state.verdict, state.error, state.status = verdict, None, "ready"
+        except Exception as e:
+            state.error, state.status = str(e), "failed"
+        finally:
+            self.running -= 1
+        state.verdict_turns = len(chat)
+        self._outcomes[state.status].inc()
+        summary = state.summary()
+        if state.stale:
+            # Turns arrived meanwhile: follow up with a verdict on the latest chat
+            now = time.monotonic()
+            state.status, state.stale, state.first_trigger = "pending", False, now
+            state.due = now + self.lanes[state.lane]["debounce_s"]
+            self._pending[state.conversation_id] = state
+        self._wake.set()
+        if self.on_verdict is not None:
+            try:
+                await self.on_verdict(summary)
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        by_status = {}
+        for state in self._states.values():
+            by_status[state.status] = by_status.get(state.status, 0) + 1
+        return {"conversations": len(self._states), "pending": len(self._pending), "running": self.running,
+                "concurrency": self.concurrency, "by_status": by_status}
@@ -1,22 +1,174 @@
+import hashlib
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langchain_ollama import OllamaLLM
 
 from io_models.mistral_nemo import ConversationInput, ConversationalScamVerdict
 from utils.constants import Constants
+from utils.metrics import REGISTRY, stage_histogram
+from utils.verdict_cache import verdict_key
+from utils.verdict_stream import VerdictStreamParser
+
+# Changes whenever the prompt does, so cached verdicts of an older prompt are never reused
+PROMPT_VERSION = hashlib.sha256(Constants.MISTRAL_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+def format_conversation(messages) -> str:
+    """Joins chat messages into the transcript format the prompt expects."""
+    return "\n".join([f"{m['role'].upper()}: '{m['text']}'" for m in messages])
+
+def first_message(conversation: str) -> str:
+    """Recovers the opening message text from a transcript built by format_conversation."""
+    first_line = conversation.strip().split("\n", 1)[0]
+    _, _, text = first_line.partition(": ")
+    return (text or first_line).strip().strip("'")
+
+def fill_frequency_from_index(inputs: dict, frequency_index) -> dict:
+    """Fills a missing `frequency` from the starter-message frequency index."""
+    if inputs.get("frequency") is not None:
+        return inputs
+    frequency = frequency_index.lookup(first_message(inputs["conversation"])) if frequency_index else 0
+    return {**inputs, "frequency": frequency}
+
+class ChainMetricsHandler(BaseCallbackHandler):
+    """
+    Records the duration of every step of the Mistral chain (prompt, LLM call, output
+    parsing, ...) in stage_duration_seconds{stage="mistral.<step>"}, plus the prompt and
+    generated token counts Ollama reports.
+    """
+
+    run_inline = True
 
-class MistralConversationAgent:
     def __init__(self):
-        model = 'mistral-nemo:12b'
+        self._starts = {}
+
+    def _start(self, run_id, name: str):
+        self._starts[run_id] = (name, time.perf_counter())
+
+    def _finish(self, run_id, error: bool = False):
+        name, started = self._starts.pop(run_id, (None, None))
+        if name is None:
+            return
+        stage_histogram(f"mistral.{name}").observe(time.perf_counter() - started)
+        if error:
+            REGISTRY.counter("mistral_errors_total", "Failed Mistral chain steps", stage=f"mistral.{name}").inc()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        self._start(run_id, kwargs.get("name") or (serialized or {}).get("name") or "chain")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=True)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id)
+        for generations in response.generations:
+            for generation in generations:
+                record_token_counts(generation.generation_info or {})
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=True)
+
+def record_token_counts(info: dict):
+    """Adds the prompt/generated token counts of an Ollama response to the token counters."""
+    REGISTRY.counter("mistral_prompt_tokens_total", "Prompt tokens evaluated by Ollama").inc(info.get("prompt_eval_count") or 0)
+    REGISTRY.counter("mistral_generated_tokens_total", "Tokens generated by Ollama").inc(info.get("eval_count") or 0)
+
+class MistralConversationAgent:
+    def __init__(self, model: str = 'mistral-nemo:12b', schema_constrained: bool = Constants.MISTRAL_SCHEMA_CONSTRAINED,
+                 num_predict: int = Constants.MISTRAL_NUM_PREDICT):
+        self.model_name = model
+        # Constraining decoding to JSON (OllamaLLM only accepts "json"; the verdict schema,
+        # fields in label, confidence, tactics order, reaches the model through the format
+        # instructions) and bounding the generation length keeps the generated tokens per verdict small
         self.llm = OllamaLLM(model=model
+                    , base_url=Constants.OLLAMA_BASE_URL
                     , num_gpu=99
-                    , num_ctx=4096)
+                    , num_ctx=Constants.MISTRAL_NUM_CTX
+                    , keep_alive=Constants.MISTRAL_KEEP_ALIVE
+                    , num_predict=num_predict
+                    , format="json" if schema_constrained else "")
         self.output_parser = JsonOutputParser(pydantic_object=ConversationalScamVerdict)
         self.prompt = PromptTemplate(
             template= Constants.MISTRAL_PROMPT_TEMPLATE, 
             input_variables=["conversation", "frequency"],
             partial_variables={"format_instructions": self.output_parser.get_format_instructions()}
         )
-    def inference_mistral(self):
-        chain = self.prompt | self.llm| self.output_parser
-        return chain.with_types(input_type=ConversationInput)
\ No newline at end of file
+
+    def _cache_key(self, inputs: dict) -> str:
+        return verdict_key(inputs["conversation"], inputs["frequency"], self.model_name, PROMPT_VERSION)
+
+    def inference_mistral(self, frequency_index=None, verdict_cache=None):
+        """
+        Builds the verdict chain. When the caller leaves `frequency` unset, it is filled
+        from `frequency_index` (utils.frequency_index.StarterFrequencyIndex) using the
+        conversation's opening message. With a `verdict_cache`
+        (utils.verdict_cache.VerdictCache), repeated conversations are answered from the
+        cache and concurrent identical ones share a single LLM call.
+        """
+        def fill_frequency(inputs: dict) -> dict:
+            return fill_frequency_from_index(inputs, frequency_index)
+
+        analysis_chain = self.prompt | self.llm| self.output_parser
+        analysis = analysis_chain
+        if verdict_cache is not None:
+            def cached_analysis(inputs: dict, config: RunnableConfig):
+                return verdict_cache.get_or_compute(self._cache_key(inputs), lambda: analysis_chain.invoke(inputs, config))
+
+            async def acached_analysis(inputs: dict, config: RunnableConfig):
+                return await verdict_cache.aget_or_compute(self._cache_key(inputs),
+                                                           lambda: analysis_chain.ainvoke(inputs, config))
+
+            analysis = RunnableLambda(cached_analysis, afunc=acached_analysis)
+
+        chain = RunnableLambda(fill_frequency) | analysis
+        return chain.with_config(callbacks=[ChainMetricsHandler()]).with_types(input_type=ConversationInput)
+
+    async def astream_verdict(self, conversation: str, frequency: int = None, frequency_index=None,
+                              verdict_cache=None, stop_early: bool = True):
+        """
+        Streams the verdict as its fields complete: yields ("label", str), ("confidence",
+        float), ("tactic", str) events and finally ("done", verdict dict). With
+        `stop_early`, generation is abandoned as soon as label and confidence are known,
+        so the final verdict may carry only the tactics seen so far.
+        """
+        inputs = fill_frequency_from_index({"conversation": conversation, "frequency": frequency}, frequency_index)
+        if verdict_cache is not None:
+            cached = verdict_cache.get(self._cache_key(inputs))
+            if cached is not None:
+                yield "label", cached["label"]
+                yield "confidence", cached["confidence"]
+                for tactic in cached.get("tactics", []):
+                    yield "tactic", tactic
+                yield "done", cached
+                return
+
+        parser = VerdictStreamParser()
+        started = time.perf_counter()
+        stream = self.llm.astream(self.prompt.format(**inputs), config={"callbacks": [ChainMetricsHandler()]})
+        try:
+            async for chunk in stream:
+                for field, value in parser.feed(chunk):
+                    if field == "label":
+                        stage_histogram("mistral.stream_first_field").observe(time.perf_counter() - started)
+                    if field != "tactics_done":
+                        yield field, value
+                if parser.complete or (stop_early and parser.has_required):
+                    break
+        finally:
+            # Closing the stream aborts the Ollama request, which stops generation
+            await stream.aclose()
+
+        if not parser.has_required:
+            raise ValueError(f"Model output did not contain a complete verdict: {parser.buffer[:200]!r}")
+        if parser.complete and verdict_cache is not None:
+            verdict_cache.put(self._cache_key(inputs), parser.verdict())
+        yield "done", parser.verdict()
@@ -0,0 +1,142 @@
+import re
+
+from models.mistral_model import format_conversation
+from utils.constants import Constants
+
+_SIGNAL_PATTERN = re.compile("|".join(Constants.SCAM_SIGNAL_PATTERNS), re.IGNORECASE)
+
+
+class TokenCounter:
+    """
+    Counts tokens with the Mistral tokenizer from the Hugging Face hub when it can be
+    loaded, otherwise with a conservative characters-per-token estimate. The tokenizer
+    is loaded on first use (or explicitly with `load()`, e.g. in the background).
+    """
+
+    def __init__(self, tokenizer_name: str = Constants.MISTRAL_TOKENIZER):
+        self.tokenizer_name = tokenizer_name
+        self._tokenizer = None
+        self._loaded = False
+
+    def load(self):
+        if not self._loaded:
+            if self.tokenizer_name:
+                try:
+                    from transformers import AutoTokenizer
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+                except Exception:
+                    self._tokenizer = None
+            self._loaded = True
+        return self._tokenizer
+
+    @property
+    def tokenizer(self):
+        return self.load()
+
+    @property
+    def exact(self) -> bool:
+        """Whether counts come from the real tokenizer (never triggers loading it)."""
+        return self._tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return len(text) // 3 + 1
+
+
+def transcript_budget(agent, token_counter: TokenCounter) -> int:
+    """Tokens left for the transcript once the fixed prompt, the answer and a safety margin fit in num_ctx."""
+    overhead = token_counter.count(agent.prompt.format(conversation="", frequency=0))
+    return Constants.MISTRAL_NUM_CTX - overhead - Constants.MISTRAL_NUM_PREDICT - Constants.MISTRAL_SESSION_SAFETY_TOKENS
+
+
+class MistralSessionAnalyzer:
+    """
+    Server-side transcript of one conversation analyzed by the Mistral chain.
+
+    Callers append only new turns. Each turn's token count is computed once, and the
+    transcript sent to the model is rebuilt under a fixed token budget: the opener,
+    turns pinned for scam signals and the most recent turns are kept verbatim, the
+    rest is condensed into a one-line summary. Prompt size, and so time to verdict,
+    stays flat as the conversation grows, while the unchanged system prompt stays a
+    reusable prefix for Ollama's prompt cache.
+    """
+
+    def __init__(self, token_counter: TokenCounter, budget_tokens: int, max_pinned: int = Constants.MISTRAL_SESSION_MAX_PINNED):
+        self.token_counter = token_counter
+        self.budget_tokens = budget_tokens
+        self.max_pinned = max_pinned
+        self.chat = []
+        self.turn_tokens = []
+        self.pinned = []
+        self.signals = []
+
+    def add_turns(self, messages, signals=None):
+        """Appends new turns; `signals` optionally lists the flagged labels of each turn (e.g. from DeBERTa)."""
+        for i, message in enumerate(messages):
+            self.chat.append({"role": message["role"], "text": message["text"]})
+            self.turn_tokens.append(self.token_counter.count(format_conversation(self.chat[-1:])) + 1)
+            turn_signals = list(signals[i]) if signals is not None else _SIGNAL_PATTERN.findall(message["text"])
+            self.signals.append(turn_signals)
+            if turn_signals and len(self.chat) > 1:
+                self.pinned.append(len(self.chat) - 1)
+                # Keep the latest signal turns; older ones fall back into the summary
+                self.pinned = self.pinned[-self.max_pinned:]
+
+    def checkpoint(self):
+        """Current state, to pass to rollback() to discard the turns added after it."""
+        return len(self.chat), list(self.pinned)
+
+    def rollback(self, checkpoint):
+        turns, pinned = checkpoint
+        del self.chat[turns:], self.turn_tokens[turns:], self.signals[turns:]
+        self.pinned = pinned
+
+    def build_transcript(self):
+        """Returns (transcript, stats) for the current session under the token budget."""
+        n = len(self.chat)
+        if n == 0:
+            return "", {"turns": 0, "turns_included": 0, "turns_condensed": 0, "transcript_tokens": 0}
+
+        included = {0}
+        used = self.turn_tokens[0]
+        for index in self.pinned:
+            if index not in included and used + self.turn_tokens[index] <= self.budget_tokens:
+                included.add(index)
+                used += self.turn_tokens[index]
+        summary_reserve = 64
+        for index in range(n - 1, 0, -1):
+            if index in included:
+                continue
+            if used + self.turn_tokens[index] + summary_reserve > self.budget_tokens:
+                break
+            included.add(index)
+            used += self.turn_tokens[index]
+
+        lines, omitted = [], []
+        for index in range(n):
+            if index in included:
+                if omitted:
+                    lines.append(self._summary(omitted))
+                    omitted = []
+                lines.append(format_conversation(self.chat[index:index + 1]))
+            else:
+                omitted.append(index)
+        if omitted:
+            lines.append(self._summary(omitted))
+
+        transcript = "\n".join(lines)
+        return transcript, {
+            "turns": n,
+            "turns_included": len(included),
+            "turns_condensed": n - len(included),
+            "transcript_tokens": self.token_counter.count(transcript),
+        }
+
+    def _summary(self, indices) -> str:
+        signals = sorted({signal.lower() for index in indices for signal in self.signals[index]})
+        roles = sorted({self.chat[index]["role"].upper() for index in indices})
+        summary = f"[... {len(indices)} earlier messages by {', '.join(roles)} condensed"
+        if signals:
+            summary += f"; signals mentioned: {', '.join(signals)}"
+        return summary + " ...]"
@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+import onnxruntime as ort
+from transformers import AutoConfig, AutoTokenizer
+
+from models.deberta_model import MODEL_INTENT_LABELS, score_nli_pairs
+from utils.constants import Constants
+
+
+def _entailment_id(config) -> int:
+    """Same lookup as the transformers zero-shot pipeline."""
+    for label, index in config.label2id.items():
+        if label.lower().startswith("entail"):
+            return index
+    return -1
+
+
+def _save_metadata(model_name: str, output_dir: str):
+    """Saves the tokenizer and config the graph runs with next to it, if not already there."""
+    if not os.path.exists(os.path.join(output_dir, "tokenizer_config.json")):
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+    if not os.path.exists(os.path.join(output_dir, "config.json")):
+        AutoConfig.from_pretrained(model_name).save_pretrained(output_dir)
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = True) -> str:
+    """
+    Exports the NLI model to ONNX under `output_dir` (once), with its tokenizer and
+    config, and, with `quantize`, applies dynamic int8 weight quantization. Returns the
+    path of the model to serve.
+    """
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, "model.int8.onnx")
+    target = int8_path if quantize else fp32_path
+    if os.path.exists(target):
+        # Exports made before the config was saved alongside get it once
+        _save_metadata(model_name, output_dir)
+        return target
+
+    os.makedirs(output_dir, exist_ok=True)
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+        dummy = dict(tokenizer(["Hi, is this Jessica?"], ["This example is Wrong Number."], return_tensors="pt"))
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in dummy}
+        dynamic_axes["logits"] = {0: "batch"}
+        with torch.no_grad():
+            torch.onnx.export(model, (dummy,), fp32_path, input_names=list(dummy), output_names=["logits"],
+                              dynamic_axes=dynamic_axes, opset_version=14)
+        tokenizer.save_pretrained(output_dir)
+        model.config.save_pretrained(output_dir)
+    _save_metadata(model_name, output_dir)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return target
+
+
+class OnnxZeroShotScorer:
+    """
+    CPU backend running the zero-shot NLI model through ONNX Runtime.
+
+    The model is exported (and int8-quantized) once into `cache_dir`; later starts load
+    the prepared file directly. Thread counts are fixed per session so replicas on
+    shared CPU nodes do not oversubscribe cores.
+    """
+
+    backend = "onnx"
+
+    def __init__(self, model_name: str, cache_dir: str = Constants.ONNX_CACHE_DIR, quantize: bool = Constants.ONNX_QUANTIZE,
+                 intra_op_threads: int = Constants.ONNX_INTRA_OP_THREADS, inter_op_threads: int = Constants.ONNX_INTER_OP_THREADS):
+        self.model_name = model_name
+        output_dir = os.path.join(os.path.expanduser(cache_dir), model_name.replace("/", "--"))
+        self.model_path = export_onnx(model_name, output_dir, quantize=quantize)
+        # The tokenizer and label map saved with the export, so a cold start needs no hub access
+        self.tokenizer = AutoTokenizer.from_pretrained(output_dir, local_files_only=True)
+        self.entailment_id = _entailment_id(AutoConfig.from_pretrained(output_dir, local_files_only=True))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        if inter_op_threads > 1:
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [graph_input.name for graph_input in self.session.get_inputs()]
+
+    def _forward(self, features):
+        inputs = {name: np.asarray(features[name], dtype=np.int64) for name in self.input_names}
+        return self.session.run(["logits"], inputs)[0]
+
+    def score_requests(self, requests):
+        return score_nli_pairs(self.tokenizer, self._forward, self.entailment_id, requests, return_tensors="np")
+
+
+def check_parity(reference, candidate, texts, labels=None, threshold: float = 0.6) -> dict:
+    """
+    Compares two scoring backends (e.g. ZeroShotScorer vs OnnxZeroShotScorer) on sample
+    texts: absolute score differences and how often both agree on label > threshold.
+    """
+    labels = list(labels or MODEL_INTENT_LABELS)
+    requests = [(text, labels) for text in texts]
+    expected = reference.score_requests(requests)
+    actual = candidate.score_requests(requests)
+    diffs = np.array([[abs(e[label] - a[label]) for label in labels] for e, a in zip(expected, actual)])
+    agreement = np.mean([[(e[label] > threshold) == (a[label] > threshold) for label in labels]
+                         for e, a in zip(expected, actual)]) if texts else 1.0
+    return {
+        "samples": len(texts),
+        "max_abs_diff": float(diffs.max()) if diffs.size else 0.0,
+        "mean_abs_diff": float(diffs.mean()) if diffs.size else 0.0,
+        "threshold_agreement": float(agreement),
+    }
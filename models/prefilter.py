@@ -0,0 +1,108 @@
+import math
+import re
+import time
+
+import numpy as np
+
+from utils.constants import Constants
+from utils.metrics import REGISTRY
+
+_ESCALATED = REGISTRY.counter("prefilter_messages_total", "Texts seen by the prefilter", decision="escalated")
+_SKIPPED = REGISTRY.counter("prefilter_messages_total", "Texts seen by the prefilter", decision="skipped")
+
+
+class MessagePrefilter:
+    """
+    Cheap first stage in front of the NLI model.
+
+    Texts (a message or the window DeBERTa would score) are hashed into word 1-2 gram
+    and character 3-5 gram features, so nothing is fitted but the linear classifier,
+    and scored by it. A text is escalated to DeBERTa when its probability reaches
+    `threshold` (tuned for recall, see tune_threshold) or when one of the keyword
+    rules (channel shifting, fees) matches; everything else skips the model.
+    """
+
+    def __init__(self, classifier=None, threshold: float = 0.5, rules: dict = None, n_features: int = 1 << 18):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.classifier = classifier
+        self.threshold = threshold
+        self.rule_patterns = dict(rules or Constants.PREFILTER_RULES)
+        self.rules = {name: re.compile("|".join(patterns), re.IGNORECASE) for name, patterns in self.rule_patterns.items()}
+        self.n_features = n_features
+        self.word_vectorizer = HashingVectorizer(ngram_range=(1, 2), n_features=n_features, alternate_sign=False)
+        self.char_vectorizer = HashingVectorizer(analyzer="char_wb", ngram_range=(3, 5), n_features=n_features,
+                                                 alternate_sign=False)
+
+    def features(self, texts):
+        from scipy.sparse import hstack
+
+        return hstack([self.word_vectorizer.transform(texts), self.char_vectorizer.transform(texts)]).tocsr()
+
+    def rule_hits(self, texts) -> list:
+        """Names of the rules matching each text."""
+        return [[name for name, rule in self.rules.items() if rule.search(text)] for text in texts]
+
+    def probabilities(self, texts) -> np.ndarray:
+        return self.classifier.predict_proba(self.features(texts))[:, 1]
+
+    def escalate(self, texts):
+        """(mask of texts to escalate, classifier probabilities) for a list of texts."""
+        texts = [str(text) for text in texts]
+        probabilities = self.probabilities(texts)
+        ruled = np.array([any(rule.search(text) for rule in self.rules.values()) for text in texts], dtype=bool)
+        escalated = ruled | (probabilities >= self.threshold)
+        _ESCALATED.inc(int(escalated.sum()))
+        _SKIPPED.inc(int(len(texts) - escalated.sum()))
+        return escalated, probabilities
+
+    def fit(self, texts, labels) -> "MessagePrefilter":
+        """Fits the classifier on texts labelled 1 (scam signal) or 0 (benign)."""
+        from sklearn.linear_model import LogisticRegression
+
+        self.classifier = LogisticRegression(solver="liblinear", class_weight="balanced")
+        self.classifier.fit(self.features([str(text) for text in texts]), np.asarray(labels, dtype=int))
+        return self
+
+    def tune_threshold(self, texts, labels, target_recall: float = Constants.PREFILTER_TARGET_RECALL) -> float:
+        """Sets the highest threshold that still escalates `target_recall` of the positive texts (rules included)."""
+        texts = [str(text) for text in texts]
+        labels = np.asarray(labels, dtype=bool)
+        if not labels.any():
+            return self.threshold
+        probabilities = self.probabilities(texts)
+        ruled = np.array([bool(hits) for hits in self.rule_hits(texts)], dtype=bool)
+        # Positives a rule already escalates count at any threshold
+        needed = math.ceil(target_recall * labels.sum()) - int((ruled & labels).sum())
+        if needed <= 0:
+            self.threshold = 1.0
+        else:
+            self.threshold = float(np.sort(probabilities[labels & ~ruled])[::-1][needed - 1])
+        return self.threshold
+
+    def evaluate(self, texts, labels) -> dict:
+        """Escalation rate, recall and precision of the escalations on labelled texts, plus throughput."""
+        labels = np.asarray(labels, dtype=bool)
+        texts = [str(text) for text in texts]
+        started = time.perf_counter()
+        escalated, _ = self.escalate(texts)
+        elapsed = time.perf_counter() - started
+        caught = int((escalated & labels).sum())
+        return {"texts": len(texts), "positives": int(labels.sum()), "threshold": self.threshold,
+                "escalation_rate": float(escalated.mean()) if len(texts) else 0.0,
+                "recall": caught / int(labels.sum()) if labels.any() else None,
+                "precision": caught / int(escalated.sum()) if escalated.any() else None,
+                "texts_per_second": len(texts) / elapsed if elapsed else None}
+
+    def save(self, path: str):
+        import joblib
+
+        joblib.dump({"classifier": self.classifier, "threshold": self.threshold, "rules": self.rule_patterns,
+                     "n_features": self.n_features}, path)
+
+    @classmethod
+    def load(cls, path: str) -> "MessagePrefilter":
+        import joblib
+
+        state = joblib.load(path)
+        return cls(state["classifier"], state["threshold"], state["rules"], state["n_features"])
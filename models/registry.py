@@ -0,0 +1,164 @@
+import threading
+import time
+
+from models.deberta_model import DebertaConversationAgent, MODEL_INTENT_LABELS, ZeroShotScorer
+from models.mistral_model import MistralConversationAgent
+from utils.constants import Constants
+from utils.metrics import REGISTRY
+
+
+def load_scorer(backend: str, model_name: str):
+    """Builds the scoring backend used by DebertaConversationAgent."""
+    if backend == "zero-shot":
+        return ZeroShotScorer(model_name)
+    if backend == "onnx":
+        from models.onnx_backend import OnnxZeroShotScorer
+        return OnnxZeroShotScorer(model_name)
+    if backend == "embedding":
+        from models.embedding_model import EmbeddingScorer
+        # Label embeddings of the active taxonomy (SAFECHATTER_TAXONOMY), not just the built-in mapping
+        return EmbeddingScorer(model_name, labels=MODEL_INTENT_LABELS)
+    raise ValueError(f"Unknown DeBERTa backend '{backend}'")
+
+
+class ModelRegistry:
+    """
+    Process-wide holder for the loaded models.
+
+    Each DeBERTa variant is loaded (and warmed up) exactly once; callers get a
+    lightweight DebertaConversationAgent per conversation that wraps the shared
+    scoring backend, so per-request state (chat, threshold, context_window) stays isolated.
+    """
+
+    def __init__(self, deberta_variants: dict = None, mistral_variants: dict = None, score_cache=None):
+        self.deberta_variants = dict(deberta_variants or Constants.DEBERTA_MODEL_VARIANTS)
+        self.mistral_variants = dict(mistral_variants or Constants.MISTRAL_MODEL_VARIANTS)
+        self._scorers = {}
+        self._mistral_agents = {}
+        self.load_times = {}
+        self.score_cache = score_cache
+        # Optional first-stage prefilter shared by all agents, loaded with the models
+        self.prefilter = None
+        # "deberta:<variant>" / "mistral:<variant>" -> {"state": pending|loading|ready|failed, ...}
+        self.states = {f"deberta:{variant}": {"state": "pending"} for variant in self.deberta_variants}
+        self.states.update({f"mistral:{variant}": {"state": "pending"} for variant in self.mistral_variants})
+        self._lock = threading.Lock()
+        # Loading one variant never blocks lookups of the others
+        self._load_locks = {variant: threading.Lock() for variant in self.deberta_variants}
+
+    def _resolve(self, variants: dict, variant: str):
+        if variant not in variants:
+            raise KeyError(f"Unknown model variant '{variant}'. Available: {sorted(variants)}")
+        return variants[variant]
+
+    def model_name(self, variant: str = "default") -> str:
+        return self._resolve(self.deberta_variants, variant)["model"]
+
+    def _set_state(self, key: str, state: str, **details):
+        self.states[key] = {"state": state, **details}
+
+    def is_ready(self, variant: str = "default") -> bool:
+        return variant in self._scorers
+
+    def scorer(self, variant: str = "default"):
+        """Returns the shared scoring backend for `variant`, loading it on first use."""
+        config = self._resolve(self.deberta_variants, variant)
+        scorer = self._scorers.get(variant)
+        if scorer is not None:
+            return scorer
+        key = f"deberta:{variant}"
+        with self._load_locks[variant]:
+            if variant not in self._scorers:
+                self._set_state(key, "loading")
+                start_time = time.time()
+                try:
+                    scorer = load_scorer(config["backend"], config["model"])
+                    scorer.score_requests([(Constants.WARMUP_MESSAGE, MODEL_INTENT_LABELS)])
+                except Exception as e:
+                    self._set_state(key, "failed", error=str(e))
+                    raise
+                self.load_times[key] = time.time() - start_time
+                REGISTRY.gauge("model_load_seconds", "Load and warm-up time of each model",
+                               model=key).set(self.load_times[key])
+                self._scorers[variant] = scorer
+                self._set_state(key, "ready", load_seconds=self.load_times[key])
+            return self._scorers[variant]
+
+    def deberta_agent(self, variant: str = "default", **kwargs) -> DebertaConversationAgent:
+        """Creates a fresh conversation agent backed by the shared scoring backend."""
+        kwargs.setdefault("prefilter", self.prefilter)
+        return DebertaConversationAgent(model_name=self.model_name(variant), scorer=self.scorer(variant),
+                                        score_cache=self.score_cache, **kwargs)
+
+    def mistral_agent(self, variant: str = "default") -> MistralConversationAgent:
+        model_name = self._resolve(self.mistral_variants, variant)
+        with self._lock:
+            if variant not in self._mistral_agents:
+                self._mistral_agents[variant] = MistralConversationAgent(model=model_name)
+            return self._mistral_agents[variant]
+
+    def warm_mistral(self, variant: str = "default"):
+        """Asks Ollama to load the model into memory (an empty prompt generates nothing)."""
+        import ollama
+
+        key = f"mistral:{variant}"
+        agent = self.mistral_agent(variant)
+        self._set_state(key, "loading")
+        start_time = time.time()
+        try:
+            ollama.Client(host=Constants.OLLAMA_BASE_URL).generate(model=agent.model_name, prompt="",
+                                                                 keep_alive=Constants.MISTRAL_KEEP_ALIVE)
+        except Exception as e:
+            # Ollama may come up later; requests will load the model on demand
+            self._set_state(key, "failed", error=str(e))
+            return
+        self.load_times[key] = time.time() - start_time
+        self._set_state(key, "ready", load_seconds=self.load_times[key])
+
+    def load_prefilter(self, path: str):
+        """Loads the prefilter agents are created with; a failure is recorded and leaves it off."""
+        from models.prefilter import MessagePrefilter
+
+        self._set_state("prefilter", "loading")
+        try:
+            self.prefilter = MessagePrefilter.load(path)
+        except Exception as e:
+            self._set_state("prefilter", "failed", error=str(e))
+            return
+        self._set_state("prefilter", "ready", threshold=self.prefilter.threshold)
+
+    def load_all(self, on_loaded=None):
+        """
+        Loads and warms up every configured model. `on_loaded(variant)` is called as
+        soon as each DeBERTa variant can serve; a variant that fails to load is
+        recorded in `states` and does not stop the others.
+        """
+        if Constants.PREFILTER_PATH:
+            self.load_prefilter(Constants.PREFILTER_PATH)
+        for variant in self.deberta_variants:
+            try:
+                self.scorer(variant)
+            except Exception:
+                continue
+            if on_loaded is not None:
+                on_loaded(variant)
+        for variant in self.mistral_variants:
+            self.warm_mistral(variant)
+
+    def load_in_background(self, on_loaded=None) -> threading.Thread:
+        """Runs load_all in a daemon thread so the server can start accepting requests right away."""
+        thread = threading.Thread(target=self.load_all, kwargs={"on_loaded": on_loaded},
+                                  name="model-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def ready(self, require_mistral: bool = Constants.READY_REQUIRES_MISTRAL) -> bool:
+        """True once every DeBERTa variant (and, if required, every Mistral model) is ready."""
+        return all(state["state"] == "ready" for key, state in self.states.items()
+                   if key.startswith("deberta:") or (require_mistral and key.startswith("mistral:")))
+
+    def loaded_variants(self) -> dict:
+        return {
+            "deberta": sorted(self._scorers),
+            "mistral": sorted(self._mistral_agents),
+        }
@@ -0,0 +1,70 @@
+import numpy as np
+
+from utils.constants import Constants
+from utils.taxonomy import Taxonomy
+
+# Per-turn scores are clipped below 1 so a single turn never contributes infinite evidence
+_MAX_TURN_SCORE = 0.999
+
+
+class ConversationRiskAggregator:
+    """
+    Session-level generic-label scores accumulated from per-turn scores.
+
+    Each turn's generic score p of a group counts as -log(1 - w * p) of evidence for it,
+    w being the weight of the turn's role. Evidence decays by `decay` every turn and
+    the session score is 1 - exp(-evidence): a single strong turn scores about what it
+    scored by itself, repeated weaker turns add up (noisy-OR), and old turns fade. An
+    update is a few array operations over the generic labels, whatever the length of
+    the conversation.
+    """
+
+    def __init__(self, taxonomy: Taxonomy, decay: float = Constants.RISK_DECAY, role_weights: dict = None,
+                 threshold: float = 0.6):
+        self.taxonomy = taxonomy
+        self.decay = decay
+        self.role_weights = {role.lower(): weight for role, weight in (role_weights or Constants.RISK_ROLE_WEIGHTS).items()}
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        size = len(self.taxonomy.generic_labels)
+        self.turns = 0
+        self.evidence = np.zeros(size)
+        # Per group: turns that flagged it, highest turn score and the last turn that flagged it
+        self.flagged_turns = np.zeros(size, dtype=np.int64)
+        self.peak = np.zeros(size)
+        self.last_flagged = np.full(size, -1, dtype=np.int64)
+
+    def update(self, generic_scores, role: str) -> np.ndarray:
+        """Adds one turn's generic scores (array in taxonomy.generic_labels order); returns the session scores."""
+        scores = np.asarray(generic_scores, dtype=np.float64)
+        weight = self.role_weights.get((role or "").lower(), 1.0)
+        self.evidence *= self.decay
+        self.evidence -= np.log1p(-np.clip(weight * scores, 0.0, _MAX_TURN_SCORE))
+        flagged = self.taxonomy.flags(scores[None, :], self.threshold)[0]
+        self.flagged_turns += flagged
+        self.last_flagged[flagged] = self.turns
+        np.maximum(self.peak, scores, out=self.peak)
+        self.turns += 1
+        return self.session_scores()
+
+    def update_map(self, scores_map: dict, role: str) -> np.ndarray:
+        """Like update, from a fine label -> score dict."""
+        return self.update(self.taxonomy.aggregate(self.taxonomy.score_matrix([scores_map]))[0], role)
+
+    def session_scores(self) -> np.ndarray:
+        return -np.expm1(-self.evidence)
+
+    def scores(self) -> list:
+        """Session scores as [{"Label", "Score"}, ...], highest first (like the per-message scores)."""
+        session = np.round(self.session_scores(), 3)
+        order = self.taxonomy.rank(session[None, :])[0]
+        labels = self.taxonomy.generic_labels
+        return [{"Label": labels[j], "Score": float(session[j])} for j in order]
+
+    def tactics(self) -> dict:
+        """Evidence per generic label flagged at least once: flagged turns, peak score, last flagged turn."""
+        return {label: {"turns": int(self.flagged_turns[j]), "peak": round(float(self.peak[j]), 3),
+                        "last_turn": int(self.last_flagged[j])}
+                for j, label in enumerate(self.taxonomy.generic_labels) if self.flagged_turns[j]}
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from models.deberta_model import DebertaConversationAgent
+from utils.admission import AdmissionController, Overloaded
+from utils.taxonomy import Taxonomy
+
+CUSTOM_TAXONOMY = Taxonomy({"asking for a gift card code": "Gift Cards", "buying gift cards for a boss": "Gift Cards",
+                            "small talk": "Genuinity"}, representatives={"Gift Cards": "asking for a gift card code"})
+
+
+class NoTokenizerScorer:
+    model_name = "fake"
+
+    def __init__(self):
+        self.requested = []
+
+    def score_requests(self, requests):
+        self.requested.extend(labels for _, labels in requests)
+        return [{label: 0.9 for label in labels} for _, labels in requests]
+
+
+def test_message_rolled_back_when_deadline_expires():
+    agent = DebertaConversationAgent(scorer=NoTokenizerScorer())
+    admission = AdmissionController(max_concurrency=1, max_queue=1, timeout=0.05)
+
+    async def slow_score(text, labels):
+        await asyncio.sleep(1)
+
+    async def run():
+        with pytest.raises(Overloaded):
+            await admission.run(lambda: agent.aprocess_message("first try", "sender", slow_score))
+
+    asyncio.run(run())
+    assert agent.chat == []
+
+
+def test_custom_taxonomy_labels_are_scored():
+    scorer = NoTokenizerScorer()
+    agent = DebertaConversationAgent(scorer=scorer, taxonomy=CUSTOM_TAXONOMY, label_mode="full")
+    _, scores, _ = agent.process_message("can you buy some gift cards?", "sender")
+    assert scorer.requested == [CUSTOM_TAXONOMY.fine_labels]
+    assert {s["Label"] for s in scores} == {"Gift Cards", "Genuinity"}
+
+
+def test_custom_taxonomy_drives_the_label_cascade():
+    scorer = NoTokenizerScorer()
+    agent = DebertaConversationAgent(scorer=scorer, taxonomy=CUSTOM_TAXONOMY, label_mode="cascade")
+    agent.process_message("can you buy some gift cards?", "sender")
+    assert scorer.requested == [["asking for a gift card code", "small talk"], ["buying gift cards for a boss"]]
+
+
+def test_incremental_agent_reports_tactic_evidence():
+    agent = DebertaConversationAgent(scorer=NoTokenizerScorer(), taxonomy=CUSTOM_TAXONOMY, label_mode="full",
+                                     scoring_mode="incremental")
+    agent.process_message("can you buy some gift cards?", "sender")
+    agent.process_message("I need them today", "sender")
+    assert agent.risk_tactics()["Gift Cards"] == {"turns": 2, "peak": 0.9, "last_turn": 1}
+    assert DebertaConversationAgent(scorer=NoTokenizerScorer()).risk_tactics() is None
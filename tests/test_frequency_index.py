@@ -0,0 +1,25 @@
+import pickle
+
+from utils.frequency_index import StarterFrequencyIndex
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = StarterFrequencyIndex(snapshot_path=path)
+    for _ in range(3):
+        index.record("Hi, is this Jessica? We met at the conference")
+    index.record("Hello, wrong number maybe?")
+    index.save()
+
+    restored = StarterFrequencyIndex(snapshot_path=path)
+    assert list(restored.lsh.items()) == list(index.lsh.items())
+    assert restored.lookup("Hi, is this Jessica? We met at the conference") == 3
+    assert restored.records == 4
+
+
+def test_pickle_snapshots_are_never_loaded(tmp_path):
+    path = str(tmp_path / "index.pkl")
+    with open(path, "wb") as f:
+        pickle.dump({"table": None, "records": 7}, f)
+    index = StarterFrequencyIndex(snapshot_path=path)
+    assert index.records == 0
@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langchain_ollama")
+
+from langchain_core.language_models.llms import LLM
+
+from models.mistral_model import MistralConversationAgent
+from utils.verdict_cache import VerdictCache
+
+VERDICT = {"label": "SCAM", "confidence": 0.9, "tactics": ["Channel Shifting Proposal"]}
+
+
+class CountingLLM(LLM):
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs) -> str:
+        self.calls += 1
+        return json.dumps(VERDICT)
+
+
+def agent_with_counting_llm():
+    agent = MistralConversationAgent()
+    agent.llm = CountingLLM()
+    return agent
+
+
+def test_cached_chain_calls_llm_once():
+    agent = agent_with_counting_llm()
+    chain = agent.inference_mistral(verdict_cache=VerdictCache())
+    inputs = {"conversation": "SENDER: 'hi, is this Anna?'", "frequency": 3}
+    assert chain.invoke(inputs) == VERDICT
+    assert chain.invoke(inputs) == VERDICT
+    assert agent.llm.calls == 1
+
+
+def test_cached_chain_calls_llm_once_async():
+    agent = agent_with_counting_llm()
+    chain = agent.inference_mistral(verdict_cache=VerdictCache())
+    inputs = {"conversation": "SENDER: 'hi, is this Anna?'", "frequency": 3}
+
+    async def run():
+        first = await asyncio.wait_for(chain.ainvoke(inputs), 5)
+        second = await asyncio.wait_for(chain.ainvoke(inputs), 5)
+        return first, second
+
+    assert asyncio.run(run()) == (VERDICT, VERDICT)
+    assert agent.llm.calls == 1
+
+
+def test_agent_builds_with_json_constrained_decoding():
+    agent = MistralConversationAgent(schema_constrained=True)
+    assert agent.llm.format == "json"
+    assert MistralConversationAgent(schema_constrained=False).llm.format == ""
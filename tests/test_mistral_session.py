@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langchain_ollama")
+
+from models.mistral_session import MistralSessionAnalyzer
+
+
+class WordCounter:
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+
+def test_rollback_discards_turns_added_after_checkpoint():
+    analyzer = MistralSessionAnalyzer(WordCounter(), budget_tokens=1000)
+    analyzer.add_turns([{"role": "sender", "text": "hi, is this Anna?"}])
+    before = analyzer.build_transcript()
+    checkpoint = analyzer.checkpoint()
+    analyzer.add_turns([{"role": "sender", "text": "add me on telegram"}, {"role": "receiver", "text": "ok"}])
+    analyzer.rollback(checkpoint)
+    assert analyzer.build_transcript() == before
+    assert analyzer.pinned == []
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+from utils.verdict_cache import VerdictCache
+
+VERDICT = {"label": "SCAM", "confidence": 0.9, "tactics": []}
+
+
+def test_waiter_takes_over_when_leader_is_cancelled():
+    cache = VerdictCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return VERDICT
+
+    async def run():
+        leader = asyncio.ensure_future(cache.aget_or_compute("key", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.aget_or_compute("key", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.wait_for(waiter, 1), leader
+
+    verdict, leader = asyncio.run(run())
+    assert verdict == VERDICT
+    assert leader.cancelled()
+    assert len(calls) == 2
+    assert cache.get("key") == VERDICT
+
+
+def test_concurrent_identical_requests_share_one_computation():
+    cache = VerdictCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return VERDICT
+
+    async def run():
+        return await asyncio.gather(*[cache.aget_or_compute("key", compute) for _ in range(3)])
+
+    assert asyncio.run(run()) == [VERDICT] * 3
+    assert len(calls) == 1
+
+
+def test_sync_waiters_see_the_leaders_interrupt():
+    cache = VerdictCache()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def interrupted():
+        started.set()
+        release.wait(1)
+        raise KeyboardInterrupt
+
+    def leader():
+        try:
+            cache.get_or_compute("key", interrupted)
+        except KeyboardInterrupt:
+            pass
+
+    def waiter():
+        try:
+            cache.get_or_compute("key", lambda: VERDICT)
+        except BaseException as e:
+            errors.append(e)
+
+    leading = threading.Thread(target=leader)
+    leading.start()
+    started.wait(1)
+    waiting = threading.Thread(target=waiter)
+    waiting.start()
+    for _ in range(100):
+        if cache.coalesced:
+            break
+        time.sleep(0.01)
+    release.set()
+    leading.join(1)
+    waiting.join(1)
+    assert [type(e) for e in errors] == [KeyboardInterrupt]
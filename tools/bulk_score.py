@@ -0,0 +1,163 @@
+"""
+Offline bulk scoring of archived conversations.
+
+Conversations are streamed from JSONL, CSV or Parquet and replayed turn by turn
+through DebertaConversationAgent, exactly as /deberta/process would see them.
+Two input layouts are accepted:
+  * one message per row: conversation_id, role, text (rows of a conversation must
+    be contiguous and in turn order), optionally frequency;
+  * JSONL only: one conversation per line with conversation_id, messages
+    ([{"role", "text"}, ...]) and optionally frequency.
+
+Chunks of conversations are scored in a process pool; within a chunk, the same turn
+of every conversation is scored in one batched call. Results are appended to a JSONL
+output in input order, and a checkpoint next to it records how far the run got, so
+an interrupted run resumes where it stopped.
+
+Usage:
+    python -m tools.bulk_score chats.parquet scores.jsonl --workers 4 --chunk-size 64 [--mistral]
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+_worker = {}
+
+
+def _read_rows(path: str, batch_size: int = 10000):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+    elif path.endswith(".csv"):
+        with open(path, newline="") as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_conversations(path: str):
+    """Yields {"conversation_id", "messages", "frequency"} one conversation at a time."""
+    rows = _read_rows(path)
+    for conversation_id, group in itertools.groupby(rows, key=lambda row: str(row["conversation_id"])):
+        group = list(group)
+        if "messages" in group[0]:
+            for row in group:
+                yield {"conversation_id": conversation_id, "messages": row["messages"],
+                       "frequency": int(row.get("frequency") or 0)}
+        else:
+            yield {"conversation_id": conversation_id,
+                   "messages": [{"role": row["role"], "text": row["text"]} for row in group],
+                   "frequency": int(group[0].get("frequency") or 0)}
+
+
+def _init_worker(variant: str, label_mode: str, run_mistral: bool, threads: int):
+    import torch
+    from models.registry import ModelRegistry
+
+    torch.set_num_threads(threads)
+    registry = ModelRegistry()
+    _worker["registry"] = registry
+    _worker["variant"] = variant
+    _worker["label_mode"] = label_mode
+    _worker["chain"] = registry.mistral_agent().inference_mistral() if run_mistral else None
+
+
+def score_chunk(conversations):
+    """Replays a chunk of conversations turn by turn; returns one result line per conversation."""
+    from models.deberta_model import process_message_batch
+    from models.mistral_model import format_conversation
+
+    registry = _worker["registry"]
+    agents = [registry.deberta_agent(_worker["variant"], label_mode=_worker["label_mode"]) for _ in conversations]
+    turns = [[] for _ in conversations]
+    for turn in range(max((len(c["messages"]) for c in conversations), default=0)):
+        active = [i for i, c in enumerate(conversations) if turn < len(c["messages"])]
+        messages = [(conversations[i]["messages"][turn]["text"], conversations[i]["messages"][turn]["role"])
+                    for i in active]
+        for i, (_, scores, elapsed) in zip(active, process_message_batch([agents[i] for i in active], messages)):
+            turns[i].append({"turn": turn, "scores": scores, "inference_time": elapsed,
+                             "context": agents[i].last_context})
+
+    results = []
+    for conversation, agent, conversation_turns in zip(conversations, agents, turns):
+        result = {"conversation_id": conversation["conversation_id"], "turns": conversation_turns}
+        if _worker["chain"] is not None and agent.chat:
+            try:
+                result["verdict"] = _worker["chain"].invoke({"conversation": format_conversation(agent.chat),
+                                                             "frequency": conversation["frequency"]})
+            except Exception as e:
+                result["verdict_error"] = str(e)
+        results.append(result)
+    return results
+
+
+def _load_checkpoint(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"conversations_done": 0, "output_bytes": 0}
+
+
+def _save_checkpoint(path: str, checkpoint: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def run(input_path: str, output_path: str, workers: int, chunk_size: int, variant: str = "default",
+        label_mode: str = "full", run_mistral: bool = False, max_pending: int = None):
+    checkpoint_path = f"{output_path}.checkpoint"
+    checkpoint = _load_checkpoint(checkpoint_path)
+    conversations = itertools.islice(read_conversations(input_path), checkpoint["conversations_done"], None)
+    chunks = iter(lambda: list(itertools.islice(conversations, chunk_size)), [])
+    max_pending = max_pending or workers * 2
+    # Split the cores between workers instead of letting each one use all of them
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    # Drop anything written after the last checkpoint so results are never duplicated
+    with open(output_path, "a") as out:
+        out.truncate(checkpoint["output_bytes"])
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(variant, label_mode, run_mistral, threads)) as pool, open(output_path, "a") as out:
+        # Keep at most `max_pending` chunks in flight so memory stays bounded
+        pending = [pool.submit(score_chunk, chunk) for chunk in itertools.islice(chunks, max_pending)]
+        while pending:
+            results = pending.pop(0).result()
+            for result in results:
+                out.write(json.dumps(result) + "\n")
+            out.flush()
+            checkpoint["conversations_done"] += len(results)
+            checkpoint["output_bytes"] = out.tell()
+            _save_checkpoint(checkpoint_path, checkpoint)
+            print(f"Scored {checkpoint['conversations_done']} conversations", flush=True)
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(pool.submit(score_chunk, chunk))
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-score archived conversations with the DeBERTa agent.")
+    parser.add_argument("input", help="JSONL, CSV or Parquet file of conversations.")
+    parser.add_argument("output", help="JSONL file the results are appended to.")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes, each loading its own model copy.")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Conversations per task (and per scoring batch).")
+    parser.add_argument("--model", default="default", help="DeBERTa model variant.")
+    parser.add_argument("--label-mode", default="full", choices=["full", "cascade"])
+    parser.add_argument("--mistral", action="store_true", help="Also run the Mistral verdict per conversation.")
+    args = parser.parse_args()
+
+    run(args.input, args.output, args.workers, args.chunk_size, variant=args.model,
+        label_mode=args.label_mode, run_mistral=args.mistral)
+
+
+if __name__ == "__main__":
+    main()
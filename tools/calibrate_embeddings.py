@@ -0,0 +1,39 @@
+"""
+Fits the per-label score calibration of the embedding backend.
+
+Input is a JSONL file with one text per line and the fine-grained labels
+(keys of Constants.DEBERTA_INTENT_MAPPING) that apply to it:
+    {"text": "Let's continue on WhatsApp", "labels": ["asking to switch to WhatsApp for private messaging"]}
+
+Usage:
+    python -m tools.calibrate_embeddings samples.jsonl calibration.json
+    SAFECHATTER_EMBEDDING_CALIBRATION=calibration.json SAFECHATTER_DEBERTA_BACKEND=embedding python api/app.py
+"""
+import argparse
+import json
+
+from models.embedding_model import EmbeddingScorer
+from utils.constants import Constants
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit embedding-backend calibration on labeled texts.")
+    parser.add_argument("path", help="JSONL file with 'text' and 'labels' fields.")
+    parser.add_argument("output", help="Where to write the calibration JSON.")
+    parser.add_argument("--model", default=Constants.EMBEDDING_MODEL_NAME)
+    args = parser.parse_args()
+
+    with open(args.path) as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+    texts = [sample["text"] for sample in samples]
+    targets = {label: [int(label in sample.get("labels", [])) for sample in samples]
+               for label in Constants.DEBERTA_INTENT_MAPPING}
+
+    scorer = EmbeddingScorer(args.model, calibration_path=None)
+    scorer.fit_calibration(texts, targets)
+    scorer.save_calibration(args.output)
+    print(f"Wrote calibration for {len(scorer.labels)} labels to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Measures how far cascade-mode scores drift from full-mode scores.
+
+Input is a JSONL file with one model input per line:
+    {"text": "Sender: hi, is this Anna?\nReceiver: no, wrong number", "labels": ["Misidentification"]}
+`labels` (generic labels that truly apply) is optional; when present, recall and
+precision of the flagged signals are reported for both modes.
+
+Usage:
+    python -m tools.cascade_drift samples.jsonl --batch-size 16
+"""
+import argparse
+import json
+import time
+
+from models.deberta_model import INTENT_LABELS_GENERIC, aggregate_generic_scores
+from models.registry import ModelRegistry
+
+
+def _read_samples(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _flags(generic_scores, threshold):
+    return {label for label, score in generic_scores.items() if score > threshold and label != "Genuinity"}
+
+
+def _precision_recall(predicted, expected):
+    true_positives = sum(len(p & e) for p, e in zip(predicted, expected))
+    n_predicted = sum(len(p) for p in predicted)
+    n_expected = sum(len(e) for e in expected)
+    return {
+        "precision": true_positives / n_predicted if n_predicted else 0.0,
+        "recall": true_positives / n_expected if n_expected else 0.0,
+    }
+
+
+def compare(samples, full_agent, cascade_agent, threshold: float, batch_size: int) -> dict:
+    drift = {label: [] for label in INTENT_LABELS_GENERIC}
+    flags, expected = {"full": [], "cascade": []}, []
+    pairs = {"full": 0, "cascade": 0}
+    seconds = {"full": 0.0, "cascade": 0.0}
+    agreements = 0
+
+    for start in range(0, len(samples), batch_size):
+        chunk = samples[start:start + batch_size]
+        texts = [sample["text"] for sample in chunk]
+        results = {}
+        for mode, agent in (("full", full_agent), ("cascade", cascade_agent)):
+            started = time.time()
+            results[mode] = agent.score_texts(texts)
+            seconds[mode] += time.time() - started
+            pairs[mode] += sum(len(scores) for scores in results[mode])
+
+        for sample, full_scores, cascade_scores in zip(chunk, results["full"], results["cascade"]):
+            full_generic = aggregate_generic_scores(full_scores)
+            cascade_generic = aggregate_generic_scores(cascade_scores)
+            for label in INTENT_LABELS_GENERIC:
+                drift[label].append(abs(full_generic.get(label, 0.0) - cascade_generic.get(label, 0.0)))
+            full_flags, cascade_flags = _flags(full_generic, threshold), _flags(cascade_generic, threshold)
+            flags["full"].append(full_flags)
+            flags["cascade"].append(cascade_flags)
+            agreements += full_flags == cascade_flags
+            if "labels" in sample:
+                expected.append(set(sample["labels"]) - {"Genuinity"})
+
+    n = len(samples)
+    report = {
+        "samples": n,
+        "threshold": threshold,
+        "flag_agreement": agreements / n if n else 0.0,
+        "pairs_per_message": {mode: count / n if n else 0.0 for mode, count in pairs.items()},
+        "seconds_per_message": {mode: total / n if n else 0.0 for mode, total in seconds.items()},
+        "drift": {
+            label: {"mean_abs": sum(values) / len(values) if values else 0.0, "max_abs": max(values, default=0.0)}
+            for label, values in drift.items()
+        },
+    }
+    if expected and len(expected) == n:
+        report["accuracy"] = {mode: _precision_recall(flags[mode], expected) for mode in flags}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cascade vs full-mode score drift on a labeled JSONL file.")
+    parser.add_argument("path", help="JSONL file with a 'text' and optional 'labels' field per line.")
+    parser.add_argument("--model", default="default", help="DeBERTa model variant.")
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--gate", type=float, default=None, help="Override the cascade gate.")
+    parser.add_argument("--benign-margin", type=float, default=None, help="Override the benign early-exit margin.")
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    full_agent = registry.deberta_agent(args.model, label_mode="full")
+    cascade_agent = registry.deberta_agent(args.model, label_mode="cascade")
+    if args.gate is not None:
+        cascade_agent.cascade.gate = args.gate
+    if args.benign_margin is not None:
+        cascade_agent.cascade.benign_margin = args.benign_margin
+
+    samples = list(_read_samples(args.path))
+    print(json.dumps(compare(samples, full_agent, cascade_agent, args.threshold, args.batch_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
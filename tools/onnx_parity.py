@@ -0,0 +1,61 @@
+"""
+Checks that the ONNX Runtime backend scores like the PyTorch zero-shot pipeline.
+
+Input is a text file with one sample per line, or a JSONL file with a 'text' field.
+Without an input file a few built-in samples are used.
+
+Usage:
+    python -m tools.onnx_parity samples.jsonl --max-abs-diff 0.05
+"""
+import argparse
+import json
+import sys
+import time
+
+from models.deberta_model import MODEL_INTENT_LABELS, ZeroShotScorer
+from models.onnx_backend import OnnxZeroShotScorer, check_parity
+from utils.constants import Constants
+
+DEFAULT_SAMPLES = [
+    Constants.WARMUP_MESSAGE,
+    "Sender: You have a lovely smile.\nSender: Let's continue on WhatsApp, it's more private.",
+    "Sender: My uncle taught me crypto trading, I made 30% this week.",
+    "Sender: To withdraw your profit you must first pay a verification fee.",
+    "Receiver: Sure, see you at the dentist at 3pm tomorrow.",
+]
+
+
+def _read_samples(path):
+    with open(path) as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+    if path.endswith(".jsonl"):
+        return [json.loads(line)["text"] for line in lines]
+    return lines
+
+
+def _timed(scorer, texts):
+    started = time.time()
+    scorer.score_requests([(text, MODEL_INTENT_LABELS) for text in texts])
+    return (time.time() - started) / max(len(texts), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ONNX Runtime and PyTorch zero-shot scores.")
+    parser.add_argument("path", nargs="?", help="Text or JSONL file with sample texts.")
+    parser.add_argument("--model", default=Constants.DEBERTA_BACKEND_MODELS["onnx"])
+    parser.add_argument("--no-quantize", action="store_true", help="Compare the fp32 ONNX model instead.")
+    parser.add_argument("--max-abs-diff", type=float, default=0.05, help="Fail when any score differs by more.")
+    args = parser.parse_args()
+
+    texts = _read_samples(args.path) if args.path else DEFAULT_SAMPLES
+    reference = ZeroShotScorer(args.model)
+    candidate = OnnxZeroShotScorer(args.model, quantize=not args.no_quantize)
+
+    report = check_parity(reference, candidate, texts)
+    report["seconds_per_text"] = {"pytorch": _timed(reference, texts), "onnx": _timed(candidate, texts)}
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["max_abs_diff"] <= args.max_abs_diff else 1)
+
+
+if __name__ == "__main__":
+    main()
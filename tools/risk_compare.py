@@ -0,0 +1,151 @@
+"""
+Compares incremental scoring with conversation risk against windowed scoring.
+
+Every conversation is replayed turn by turn twice with the same model: once with
+the default windowed agent (the recent context re-scored with every message) and
+once in incremental mode (each turn scored once, session-level scores from
+models.risk.ConversationRiskAggregator). The same turn of every conversation of a
+chunk is scored in one batched call, as in tools.bulk_score, which also reads the
+input (JSONL, CSV or Parquet; benchmarks.conversations output works as is).
+
+Reported per mode: model tokens and scoring time. Reported between the modes, per
+generic label: mean absolute difference and correlation of the windowed scores with
+the session risk at each turn, and how often the flagged labels agree. When the
+input carries a "label" per conversation (SCAM / BENIGN), the share of scam and
+benign conversations each mode flags at some turn, and the mean turn of the first
+flag on scam conversations.
+
+Usage:
+    python -m tools.risk_compare conversations.jsonl --output risk_compare.json [--details turns.jsonl]
+"""
+import argparse
+import itertools
+import json
+import time
+
+import numpy as np
+
+from tools.bulk_score import read_conversations
+
+MODES = ("window", "incremental")
+
+
+def _score_vector(scores: list, labels: list) -> list:
+    by_label = {s["Label"]: s["Score"] for s in scores}
+    return [by_label.get(label, 0.0) for label in labels]
+
+
+def replay(registry, variant: str, conversations: list, mode: str) -> list:
+    """Per conversation, per turn: the mode's scores as vectors in generic label order."""
+    from models.deberta_model import INTENT_LABELS_GENERIC, process_message_batch
+
+    agents = [registry.deberta_agent(variant, scoring_mode=mode) for _ in conversations]
+    turns = [[] for _ in conversations]
+    for turn in range(max((len(c["messages"]) for c in conversations), default=0)):
+        active = [i for i, c in enumerate(conversations) if turn < len(c["messages"])]
+        messages = [(conversations[i]["messages"][turn]["text"], conversations[i]["messages"][turn]["role"])
+                    for i in active]
+        for i, (_, scores, _) in zip(active, process_message_batch([agents[i] for i in active], messages)):
+            risk = agents[i].risk_scores()
+            turns[i].append(_score_vector(risk if risk is not None else scores, INTENT_LABELS_GENERIC))
+    return turns
+
+
+def _first_flag(matrix: np.ndarray, flaggable: np.ndarray, threshold: float):
+    flagged = np.flatnonzero(((matrix > threshold) & flaggable).any(axis=1))
+    return int(flagged[0]) if len(flagged) else None
+
+
+def compare(conversations: list, results: dict, labels: list, benign_label: str, threshold: float) -> dict:
+    flaggable = np.array([label != benign_label for label in labels])
+    window = np.array([row for turns in results["window"] for row in turns])
+    risk = np.array([row for turns in results["incremental"] for row in turns])
+    if not len(window):
+        return {}
+
+    per_label = {}
+    for j, label in enumerate(labels):
+        correlation = np.corrcoef(window[:, j], risk[:, j])[0, 1] if window[:, j].std() and risk[:, j].std() else None
+        per_label[label] = {"mean_abs_diff": float(np.abs(window[:, j] - risk[:, j]).mean()),
+                            "correlation": None if correlation is None else float(correlation),
+                            "window_flag_rate": float((window[:, j] > threshold).mean()),
+                            "risk_flag_rate": float((risk[:, j] > threshold).mean())}
+    window_flags = (window > threshold) & flaggable
+    risk_flags = (risk > threshold) & flaggable
+    report = {"turns": len(window), "per_label": per_label,
+              "flag_agreement": float((window_flags == risk_flags).all(axis=1).mean())}
+
+    if all("label" in c for c in conversations):
+        outcome = {mode: {"SCAM": [], "BENIGN": []} for mode in MODES}
+        for index, conversation in enumerate(conversations):
+            for mode in MODES:
+                first = _first_flag(np.array(results[mode][index]).reshape(-1, len(labels)), flaggable, threshold)
+                outcome[mode].setdefault(conversation["label"], []).append(first)
+        report["detection"] = {}
+        for mode in MODES:
+            scam, benign = outcome[mode]["SCAM"], outcome[mode]["BENIGN"]
+            first_flags = [turn for turn in scam if turn is not None]
+            report["detection"][mode] = {
+                "scam_flagged": sum(turn is not None for turn in scam) / len(scam) if scam else None,
+                "benign_flagged": sum(turn is not None for turn in benign) / len(benign) if benign else None,
+                "mean_first_flag_turn": float(np.mean(first_flags)) if first_flags else None}
+    return report
+
+
+def run(input_path: str, variant: str = "default", chunk_size: int = 64, limit: int = None, threshold: float = 0.6,
+        details_path: str = None) -> dict:
+    from models.deberta_model import INTENT_LABELS_GENERIC, TAXONOMY
+    from models.registry import ModelRegistry
+    from utils.metrics import REGISTRY
+
+    registry = ModelRegistry()
+    registry.scorer(variant)
+    tokens = REGISTRY.counter("deberta_tokens_total")
+    conversations, results = [], {mode: [] for mode in MODES}
+    cost = {mode: {"tokens": 0, "seconds": 0.0} for mode in MODES}
+    source = itertools.islice(read_conversations(input_path), limit)
+    for chunk in iter(lambda: list(itertools.islice(source, chunk_size)), []):
+        conversations.extend(chunk)
+        for mode in MODES:
+            tokens_before, started = tokens.value(), time.perf_counter()
+            results[mode].extend(replay(registry, variant, chunk, mode))
+            cost[mode]["seconds"] += time.perf_counter() - started
+            cost[mode]["tokens"] += int(tokens.value() - tokens_before)
+        print(f"Compared {len(conversations)} conversations", flush=True)
+
+    if details_path:
+        with open(details_path, "w") as f:
+            for index, conversation in enumerate(conversations):
+                for turn, (window_row, risk_row) in enumerate(zip(results["window"][index], results["incremental"][index])):
+                    f.write(json.dumps({"conversation_id": conversation["conversation_id"], "turn": turn,
+                                        "window": dict(zip(INTENT_LABELS_GENERIC, window_row)),
+                                        "risk": dict(zip(INTENT_LABELS_GENERIC, risk_row))}) + "\n")
+
+    report = {"conversations": len(conversations), "threshold": threshold, "cost": cost}
+    report.update(compare(conversations, results, INTENT_LABELS_GENERIC, TAXONOMY.benign_group, threshold))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare incremental risk aggregation with windowed scoring.")
+    parser.add_argument("input", help="JSONL, CSV or Parquet file of conversations.")
+    parser.add_argument("--output", default="risk_compare.json", help="Where to write the JSON report.")
+    parser.add_argument("--details", help="Optional JSONL of both modes' scores per turn.")
+    parser.add_argument("--model", default="default", help="DeBERTa model variant.")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Conversations per scoring batch.")
+    parser.add_argument("--limit", type=int, help="Compare only the first N conversations.")
+    parser.add_argument("--threshold", type=float, default=0.6, help="Score above which a label counts as flagged.")
+    args = parser.parse_args()
+
+    report = run(args.input, args.model, args.chunk_size, args.limit, args.threshold, args.details)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for mode, cost in report["cost"].items():
+        print(f"{mode}: {cost['tokens']} tokens, {cost['seconds']:.1f}s")
+    print(f"flag agreement per turn: {report.get('flag_agreement', 0):.1%}")
+    for mode, detection in report.get("detection", {}).items():
+        print(f"{mode}: {detection}")
+
+
+if __name__ == "__main__":
+    main()
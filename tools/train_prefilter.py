@@ -0,0 +1,105 @@
+"""
+Trains the first-stage prefilter (models.prefilter.MessagePrefilter) on labelled chats.
+
+Input is JSONL in either layout:
+  * one message per line: {"text": "...", "label": 1} (1 / "SCAM" = scam signal, 0 / "BENIGN");
+  * one conversation per line: {"messages": [{"role", "text"}, ...], "label": "SCAM"}, as written
+    by benchmarks.conversations. Every turn becomes a window of the last --window messages
+    formatted like the agent's context, labelled with the conversation's label.
+
+The prefilter sees what the agent would score, so --window follows the configured
+scoring mode (Constants.DEBERTA_SCORING_MODE): the incremental context in
+"incremental" mode, and in "window" mode every message so far (0), since the served
+context is token-budgeted rather than a fixed number of messages. Very long
+conversations are therefore slightly longer here than served.
+
+Conversations (or messages) are split into train, validation and test sets. The
+classifier is fitted on train, its threshold is set on validation to reach
+--target-recall, and the escalation rate, recall, precision and throughput are
+reported on test. The model is written to `output`, the report next to it.
+
+Usage:
+    python -m tools.train_prefilter chats.jsonl prefilter.joblib --target-recall 0.98
+    SAFECHATTER_PREFILTER=prefilter.joblib python api/app.py
+"""
+import argparse
+import json
+import random
+
+from models.prefilter import MessagePrefilter
+from utils.constants import Constants
+
+
+def _label(value) -> int:
+    if isinstance(value, str):
+        return int(value.strip().upper() in ("SCAM", "1", "TRUE"))
+    return int(bool(value))
+
+
+def default_window() -> int:
+    """Messages the agent scores per turn in the configured scoring mode (0: all so far)."""
+    return Constants.DEBERTA_INCREMENTAL_CONTEXT + 1 if Constants.DEBERTA_SCORING_MODE == "incremental" else 0
+
+
+def read_samples(path: str, window: int) -> list:
+    """Groups of (text, label) samples; a conversation's windows stay in one group."""
+    groups = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            label = _label(row["label"])
+            if "messages" not in row:
+                groups.append([(row["text"], label)])
+                continue
+            lines = [f"{m['role']}: {m['text']}" for m in row["messages"]]
+            groups.append([("\n".join(lines[max(0, turn + 1 - window) if window > 0 else 0:turn + 1]), label)
+                           for turn in range(len(lines))])
+    return groups
+
+
+def split(groups: list, validation: float, test: float, seed: int):
+    groups = list(groups)
+    random.Random(seed).shuffle(groups)
+    n_test, n_validation = int(len(groups) * test), int(len(groups) * validation)
+    parts = groups[:n_test], groups[n_test:n_test + n_validation], groups[n_test + n_validation:]
+    return [([text for group in part for text, _ in group], [label for group in part for _, label in group])
+            for part in parts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the hashed linear prefilter in front of DeBERTa.")
+    parser.add_argument("path", help="JSONL file of labelled messages or conversations.")
+    parser.add_argument("output", help="Where to write the trained prefilter.")
+    parser.add_argument("--window", type=int, default=default_window(),
+                        help="Messages per window for conversation input (1: each message alone, "
+                             "0: every message so far). Defaults to what the configured scoring mode scores.")
+    parser.add_argument("--target-recall", type=float, default=Constants.PREFILTER_TARGET_RECALL)
+    parser.add_argument("--validation", type=float, default=0.2, help="Share of the data used to set the threshold.")
+    parser.add_argument("--test", type=float, default=0.2, help="Share of the data the report is computed on.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    (test_texts, test_labels), (validation_texts, validation_labels), (train_texts, train_labels) = split(
+        read_samples(args.path, args.window), args.validation, args.test, args.seed)
+    if len(set(train_labels)) < 2:
+        parser.error("the training split needs both scam and benign samples")
+
+    prefilter = MessagePrefilter().fit(train_texts, train_labels)
+    prefilter.tune_threshold(validation_texts or train_texts, validation_labels or train_labels, args.target_recall)
+    report = {"train": len(train_texts), "validation": len(validation_texts), "target_recall": args.target_recall,
+              "window": args.window, "test": prefilter.evaluate(test_texts or validation_texts,
+                                                                test_labels or validation_labels)}
+    prefilter.save(args.output)
+    with open(f"{args.output}.report.json", "w") as f:
+        json.dump(report, f, indent=2)
+
+    test = report["test"]
+    print(f"Threshold {prefilter.threshold:.4f}: escalates {test['escalation_rate']:.1%} of {test['texts']} test texts, "
+          f"recall {test['recall'] or 0:.1%}, precision {test['precision'] or 0:.1%}, "
+          f"{test['texts_per_second'] or 0:.0f} texts/s")
+
+
+if __name__ == "__main__":
+    main()
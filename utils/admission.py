@@ -0,0 +1,85 @@
+import asyncio
+import math
+import time
+from collections import Counter
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; carries the HTTP status and a Retry-After hint."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded admission in front of the inference executor.
+
+    At most `max_concurrency` requests run at once and at most `max_queue` wait for a
+    slot. A full queue is rejected immediately with 429; a request that cannot finish
+    within its deadline (waiting included) is rejected with 503. Both carry a
+    Retry-After estimate derived from the recent service time.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejections = Counter()
+        self._avg_service_time = 0.0
+        self._semaphore = None
+
+    def _retry_after(self) -> float:
+        backlog = (self.queued + self.in_flight) / max(self.max_concurrency, 1)
+        return max(1.0, math.ceil(self._avg_service_time * backlog))
+
+    def _reject(self, reason: str, status_code: int, detail: str):
+        self.rejections[reason] += 1
+        raise Overloaded(status_code, detail, self._retry_after())
+
+    async def run(self, coro_fn, timeout: float = None):
+        """Runs `coro_fn()` once admitted, enforcing the queue bound and the deadline."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.queued >= self.max_queue:
+            self._reject("queue_full", 429, "Inference queue is full, please retry later.")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout if timeout is not None else self.timeout)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            self._reject("queue_timeout", 503, "Request deadline expired while queued.")
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(coro_fn(), timeout=max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            self._reject("deadline", 503, "Request deadline expired during inference.")
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            elapsed = time.monotonic() - started
+            self._avg_service_time = 0.9 * self._avg_service_time + 0.1 * elapsed if self.completed else elapsed
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "completed": self.completed,
+            "rejections": dict(self.rejections),
+            "avg_service_time": self._avg_service_time,
+        }
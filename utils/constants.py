@@ -1,4 +1,74 @@
+import os
+
+
 class Constants:
+    # Scoring backend of the DeBERTa endpoints: "zero-shot" (PyTorch cross-encoder),
+    # "onnx" (quantized ONNX Runtime cross-encoder for CPU nodes, see models.onnx_backend)
+    # or "embedding" (bi-encoder, see models.embedding_model)
+    DEBERTA_BACKEND = os.getenv("SAFECHATTER_DEBERTA_BACKEND", "zero-shot")
+    DEBERTA_BACKEND_MODELS = {
+        "zero-shot": "MoritzLaurer/deberta-v3-large-zeroshot-v2.0",
+        "onnx": "MoritzLaurer/deberta-v3-large-zeroshot-v2.0",
+        "embedding": "sentence-transformers/all-mpnet-base-v2",
+    }
+    EMBEDDING_MODEL_NAME = DEBERTA_BACKEND_MODELS["embedding"]
+    EMBEDDING_CALIBRATION = {"scale": 20.0, "bias": 0.35}
+    EMBEDDING_CALIBRATION_PATH = os.getenv("SAFECHATTER_EMBEDDING_CALIBRATION")
+    ONNX_CACHE_DIR = os.getenv("SAFECHATTER_ONNX_DIR", "~/.cache/safechatter/onnx")
+    ONNX_QUANTIZE = os.getenv("SAFECHATTER_ONNX_QUANTIZE", "1") == "1"
+    ONNX_INTRA_OP_THREADS = int(os.getenv("SAFECHATTER_ONNX_INTRA_OP_THREADS", "4"))
+    ONNX_INTER_OP_THREADS = int(os.getenv("SAFECHATTER_ONNX_INTER_OP_THREADS", "1"))
+
+    # Named model variants served by the API. Requests pick one by its key.
+    DEBERTA_MODEL_VARIANTS = {
+        "default": {"backend": DEBERTA_BACKEND, "model": DEBERTA_BACKEND_MODELS[DEBERTA_BACKEND]},
+    }
+    MISTRAL_MODEL_VARIANTS = {
+        "default": "mistral-nemo:12b",
+    }
+    WARMUP_MESSAGE = "Hi, is this Jessica? I think I have the wrong number."
+
+    # Prepared model artifacts (safetensors + tokenizer) for fast cold starts; unset to disable
+    MODEL_ARTIFACT_DIR = os.getenv("SAFECHATTER_ARTIFACT_DIR", "~/.cache/safechatter/models")
+    # Retry-After sent while the requested model is still loading
+    STARTUP_RETRY_AFTER_S = 5
+    # Whether /readyz also waits for the Mistral model to be loaded in Ollama
+    READY_REQUIRES_MISTRAL = os.getenv("SAFECHATTER_READY_REQUIRES_MISTRAL", "0") == "1"
+
+    # Multi-worker serving (see api.serve): workers are forked once the models are loaded
+    # and split the available cores; 0 threads per worker means cores / workers
+    SERVE_WORKERS = int(os.getenv("SAFECHATTER_WORKERS", "1"))
+    SERVE_THREADS_PER_WORKER = int(os.getenv("SAFECHATTER_THREADS_PER_WORKER", "0"))
+
+    # Longest premise + hypothesis pair fed to the NLI model; the chat context gets what the
+    # longest hypothesis leaves of it, filled with the most recent messages first
+    DEBERTA_MAX_SEQUENCE_TOKENS = int(os.getenv("SAFECHATTER_DEBERTA_MAX_SEQUENCE_TOKENS", "512"))
+
+    # Micro-batching of concurrent DeBERTa requests (see models.batching)
+    DEBERTA_MAX_BATCH_SIZE = 16
+    DEBERTA_MAX_BATCH_WAIT_MS = 10.0
+
+    # Inference executor and admission control (see utils.admission)
+    DEBERTA_INFERENCE_THREADS = 1
+    DEBERTA_MAX_CONCURRENCY = 64
+    DEBERTA_MAX_QUEUE = 256
+    DEBERTA_REQUEST_TIMEOUT_S = 10.0
+
+    # Server-side conversation sessions (see utils.sessions)
+    SESSION_MAX_COUNT = 10000
+    SESSION_TTL_S = 3600.0
+    SESSION_MAX_BYTES = 64 * 1024 * 1024
+
+    # Live scoring channel (/deberta/ws): messages waiting to be scored per connection before
+    # new ones are refused, server heartbeat interval and how long a silent client is kept
+    WS_MAX_PENDING = 32
+    WS_HEARTBEAT_S = 15.0
+    WS_IDLE_TIMEOUT_S = 60.0
+
+    # Zero-shot score cache (see utils.score_cache); set the env var to persist it in SQLite
+    SCORE_CACHE_MAX_ENTRIES = 50000
+    SCORE_CACHE_DB_PATH = os.getenv("SAFECHATTER_SCORE_CACHE_DB")
+
     DEBERTA_INTENT_MAPPING = {
         "Wrong Number": "Misidentification",
         "Accidental Apology": "Misidentification",
@@ -26,6 +96,109 @@ class Constants:
         "Benign": "Genuinity"
     }
 
+    # Optional JSON taxonomy replacing DEBERTA_INTENT_MAPPING (see utils.taxonomy.Taxonomy.from_config)
+    DEBERTA_TAXONOMY_PATH = os.getenv("SAFECHATTER_TAXONOMY")
+
+    # Starter-message frequency index (see utils.frequency_index); set the env var to persist snapshots
+    FREQUENCY_INDEX_PATH = os.getenv("SAFECHATTER_FREQUENCY_INDEX")
+    FREQUENCY_HALF_LIFE_S = 7 * 24 * 3600.0
+    FREQUENCY_SNAPSHOT_INTERVAL_S = 300.0
+
+    # Opt-in sampling profiler: requests slower than this dump their hottest stacks (0 disables it)
+    PROFILE_SLOW_REQUEST_MS = float(os.getenv("SAFECHATTER_PROFILE_SLOW_MS", "0"))
+    PROFILE_INTERVAL_MS = 5.0
+    PROFILE_OUTPUT_DIR = os.getenv("SAFECHATTER_PROFILE_DIR")
+
+    # Ollama server the Mistral agent talks to (e.g. benchmarks.fake_ollama for offline runs)
+    OLLAMA_BASE_URL = os.getenv("SAFECHATTER_OLLAMA_BASE_URL", "http://localhost:11434")
+
+    # Mistral generation: JSON-constrained decoding and a bounded number of generated tokens
+    MISTRAL_SCHEMA_CONSTRAINED = os.getenv("SAFECHATTER_MISTRAL_SCHEMA", "1") == "1"
+    MISTRAL_NUM_PREDICT = int(os.getenv("SAFECHATTER_MISTRAL_NUM_PREDICT", "256"))
+
+    # Session-level Mistral analysis (see models.mistral_session)
+    MISTRAL_NUM_CTX = 4096
+    MISTRAL_KEEP_ALIVE = "30m"
+    MISTRAL_TOKENIZER = os.getenv("SAFECHATTER_MISTRAL_TOKENIZER", "mistralai/Mistral-Nemo-Instruct-2407")
+    MISTRAL_SESSION_MAX_PINNED = 12
+    MISTRAL_SESSION_SAFETY_TOKENS = 128
+    # Cheap regexes marking turns worth keeping verbatim in condensed transcripts
+    SCAM_SIGNAL_PATTERNS = [
+        r"\bwhats\s?app\b", r"\btelegram\b", r"\bwechat\b", r"\bmessenger\b", r"\bsignal app\b",
+        r"\bcrypto\w*\b", r"\bbitcoin\b", r"\busdt\b", r"\bforex\b", r"\binvest\w*\b", r"\bprofits?\b",
+        r"\bfees?\b", r"\bdeposit\w*\b", r"\bwithdraw\w*\b", r"\btax(?:es)?\b", r"\bgift ?cards?\b",
+        r"\bwrong number\b", r"\burgent\w*\b",
+    ]
+
+    # Mistral verdict cache (see utils.verdict_cache)
+    VERDICT_CACHE_MAX_ENTRIES = 10000
+    VERDICT_CACHE_TTL_S = 24 * 3600.0
+
+    # Incremental scoring (DebertaConversationAgent scoring_mode="incremental"): each turn is
+    # scored once, with at most DEBERTA_INCREMENTAL_CONTEXT preceding messages, and a
+    # ConversationRiskAggregator (see models.risk) accumulates the session-level scores
+    DEBERTA_SCORING_MODE = os.getenv("SAFECHATTER_DEBERTA_SCORING_MODE", "window")
+    DEBERTA_INCREMENTAL_CONTEXT = 1
+    # Evidence kept from one turn to the next, and weight of each role's turns (others get 1.0)
+    RISK_DECAY = 0.9
+    RISK_ROLE_WEIGHTS = {"sender": 1.0, "receiver": 0.5}
+
+    # Optional first stage in front of DeBERTa (see models.prefilter, trained with
+    # tools.train_prefilter): messages it does not escalate skip the NLI model
+    PREFILTER_PATH = os.getenv("SAFECHATTER_PREFILTER")
+    PREFILTER_TARGET_RECALL = 0.98
+    # Always escalated, whatever the classifier says
+    PREFILTER_RULES = {
+        "channel_shift": [
+            r"\b(?:whats\s?app|telegram|wechat|viber|kakao(?:talk)?|signal app|line app)\b",
+            r"\b(?:add|text|message|contact|call|chat with|find) me (?:on|at|via|in)\b",
+            r"\b(?:download|install|switch to|move to|continue on)\b.{0,20}\bapp\b",
+        ],
+        "fees": [
+            r"\b(?:fee|fees|tax|taxes|deposit|withdraw\w*|verification|unlock|release|margin)\b.{0,40}"
+            r"(?:\$\s?\d|\d+\s?(?:usd|usdt|dollars?)\b)",
+            r"\b(?:pay|send|transfer|wire)\b.{0,30}\b(?:usdt|btc|bitcoin|crypto|gift ?cards?|western union)\b",
+        ],
+    }
+
+    # Background escalation to the Mistral verdict (see models.escalation): a conversation
+    # is queued once every label of a rule has scored at least the rule's threshold
+    ESCALATION_ENABLED = os.getenv("SAFECHATTER_ESCALATION", "1") == "1"
+    ESCALATION_RULES = [
+        {"name": "financial_request", "labels": ["Seeking Financial Support"], "threshold": 0.7, "lane": "high"},
+        {"name": "channel_shift_investment", "labels": ["Channel Shifting Proposal", "Financial Gains Opportunity"],
+         "threshold": 0.6, "lane": "high"},
+        {"name": "investment_pitch", "labels": ["Financial Gains Opportunity"], "threshold": 0.75, "lane": "normal"},
+        {"name": "urgency", "labels": ["Sense of Urgency"], "threshold": 0.8, "lane": "normal"},
+    ]
+    # Lanes in priority order; a queued conversation waits until quiet for debounce_s
+    ESCALATION_LANES = {"high": {"debounce_s": 1.0}, "normal": {"debounce_s": 5.0}}
+    ESCALATION_MAX_DELAY_S = 30.0
+    # Verdicts in flight at once; match the Ollama server's OLLAMA_NUM_PARALLEL
+    ESCALATION_CONCURRENCY = int(os.getenv("SAFECHATTER_ESCALATION_CONCURRENCY", "1"))
+    # New turns after a verdict before the conversation is escalated again
+    ESCALATION_REFRESH_TURNS = 4
+    # Past this many queued conversations, only the first lane is queued
+    ESCALATION_MAX_PENDING = 256
+    ESCALATION_MAX_CONVERSATIONS = 10000
+    ESCALATION_TTL_S = 3600.0
+
+    # Label cascade (see models.deberta_model.LabelCascade): one representative
+    # hypothesis per generic group is scored first, the rest only past the gate
+    DEBERTA_LABEL_MODE = os.getenv("SAFECHATTER_DEBERTA_LABEL_MODE", "full")
+    DEBERTA_CASCADE_GATE = 0.3
+    DEBERTA_CASCADE_BENIGN_MARGIN = 0.5
+    DEBERTA_GROUP_REPRESENTATIVES = {
+        "Misidentification": "Wrong Number",
+        "Flattery": "Friendly Flattery",
+        "Personal Info Seeking": "Personal Info Seeking",
+        "Financial Gains Opportunity": "Investment Offering",
+        "Channel Shifting Proposal": "proposing to download and use a different messaging platform",
+        "Seeking Financial Support": "Urgent Deposit Request",
+        "Sense of Urgency": "Scarcity Pressure",
+        "Genuinity": "Benign"
+    }
+
     MISTRAL_PROMPT_TEMPLATE = """
     <|begin_of_text|><|start_header_id|>system<|end_header_id|>
     You are an expert analyst specializing in the detection of multi-stage **conversational scams**.
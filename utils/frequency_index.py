@@ -0,0 +1,208 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import zipfile
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_MASK_64 = (1 << 64) - 1
+
+
+def normalize_opener(text: str) -> str:
+    """Lowercases and masks digits/URLs so templated openers share their shingles."""
+    text = text.lower()
+    text = re.sub(r"https?://\S+|www\.\S+", " url ", text)
+    text = re.sub(r"\d+", "0", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class CountMinSketch:
+    """
+    Count-min sketch with exponential time decay.
+
+    Counts are stored in a growing time scale (each increment weighs
+    exp(decay * (t - origin))), so decaying all counters costs nothing until the
+    scale is folded back into the table.
+    """
+
+    def __init__(self, width: int, depth: int, half_life_seconds: float):
+        self.width = width
+        self.depth = depth
+        self.decay = math.log(2) / half_life_seconds
+        self.table = np.zeros((depth, width), dtype=np.float64)
+        self.origin = time.time()
+        self._seeds = [(row * 0x9E3779B97F4A7C15) & _MASK_64 for row in range(1, depth + 1)]
+
+    def _columns(self, key: int):
+        # Plain integer mixing: cheaper than numpy for a handful of cells
+        return [((((key ^ seed) * 0xBF58476D1CE4E5B9) & _MASK_64) >> 31) % self.width for seed in self._seeds]
+
+    def _weight(self, now: float) -> float:
+        exponent = self.decay * (now - self.origin)
+        if exponent > 50:
+            # Fold the scale back into the table before it overflows
+            self.table *= math.exp(-exponent)
+            self.origin = now
+            exponent = 0.0
+        return math.exp(exponent)
+
+    def add(self, key: int, now: float = None) -> float:
+        now = now or time.time()
+        weight = self._weight(now)
+        counts = []
+        for row, column in enumerate(self._columns(key)):
+            self.table[row, column] += weight
+            counts.append(self.table[row, column])
+        return float(min(counts)) / weight
+
+    def estimate(self, key: int, now: float = None) -> float:
+        now = now or time.time()
+        return float(min(self.table[row, column] for row, column in enumerate(self._columns(key)))) / self._weight(now)
+
+
+class StarterFrequencyIndex:
+    """
+    Streaming, time-decayed frequency index over conversation opening messages.
+
+    Openers are grouped by near-duplicate similarity with MinHash signatures and LSH
+    banding (templated openers with different names land in the same group), and each
+    group's decayed count lives in a count-min sketch. The whole state is periodically
+    snapshotted to `snapshot_path`, in a background thread so `record()` never waits on
+    disk, and reloaded on start.
+    """
+
+    def __init__(self, snapshot_path: str = None, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 4, width: int = 1 << 16, depth: int = 4,
+                 half_life_seconds: float = 7 * 24 * 3600.0, max_lsh_entries: int = 1000000,
+                 snapshot_interval: float = 300.0):
+        assert num_perm % bands == 0, "num_perm must be a multiple of bands"
+        self.snapshot_path = snapshot_path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_lsh_entries = max_lsh_entries
+        self.snapshot_interval = snapshot_interval
+        rng = np.random.RandomState(7)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.sketch = CountMinSketch(width, depth, half_life_seconds)
+        self.lsh = OrderedDict()  # (band << 32 | crc32 of band) -> group id
+        self.records = 0
+        self._recent_keys = OrderedDict()
+        self._last_snapshot = time.time()
+        self._snapshot_thread = None
+        self._lock = threading.Lock()
+        if snapshot_path and os.path.exists(snapshot_path):
+            try:
+                self.load(snapshot_path)
+            except (ValueError, KeyError, OSError, zipfile.BadZipFile):
+                # e.g. a pickle snapshot of an older version, which is never unpickled
+                logger.warning("Ignoring unreadable frequency index snapshot %s", snapshot_path, exc_info=True)
+
+    def _signature(self, normalized: str) -> np.ndarray:
+        if len(normalized) <= self.shingle_size:
+            shingles = {normalized}
+        else:
+            shingles = {normalized[i:i + self.shingle_size] for i in range(len(normalized) - self.shingle_size + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (hashes[:, None] * self._a[None, :] + self._b[None, :]) % np.uint64(_MERSENNE_PRIME)
+        return (permuted & np.uint64(_MAX_HASH)).min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray):
+        raw = signature.astype(np.uint32).tobytes()
+        size = self.rows * 4
+        return [(band << 32) | zlib.crc32(raw[band * size:(band + 1) * size]) for band in range(self.bands)]
+
+    def _keys_for(self, text: str):
+        """Band keys of `text`; exact repeats (the bulk-sent case) skip the MinHash."""
+        normalized = normalize_opener(text)
+        band_keys = self._recent_keys.get(normalized)
+        if band_keys is None:
+            band_keys = self._band_keys(self._signature(normalized))
+            self._recent_keys[normalized] = band_keys
+            if len(self._recent_keys) > 10000:
+                self._recent_keys.popitem(last=False)
+        return band_keys
+
+    def _group(self, band_keys, create: bool):
+        for key in band_keys:
+            group = self.lsh.get(key)
+            if group is not None:
+                self.lsh.move_to_end(key)
+                return group
+        if not create:
+            return None
+        group = band_keys[0]
+        for key in band_keys:
+            self.lsh[key] = group
+        while len(self.lsh) > self.max_lsh_entries:
+            self.lsh.popitem(last=False)
+        return group
+
+    def record(self, text: str) -> int:
+        """Counts `text` as the opener of a new conversation; returns its group's count."""
+        with self._lock:
+            band_keys = self._keys_for(text)
+            count = self.sketch.add(self._group(band_keys, create=True))
+            self.records += 1
+            should_snapshot = (self.snapshot_path and time.time() - self._last_snapshot > self.snapshot_interval
+                               and (self._snapshot_thread is None or not self._snapshot_thread.is_alive()))
+            if should_snapshot:
+                self._last_snapshot = time.time()
+                self._snapshot_thread = threading.Thread(target=self.save, name="frequency-index-snapshot",
+                                                         daemon=True)
+        if should_snapshot:
+            self._snapshot_thread.start()
+        return int(round(count))
+
+    def lookup(self, text: str) -> int:
+        """Decayed count of openers near-duplicate to `text` (0 if never seen)."""
+        with self._lock:
+            band_keys = self._keys_for(text)
+            group = self._group(band_keys, create=False)
+            return int(round(self.sketch.estimate(group))) if group is not None else 0
+
+    def save(self, path: str = None):
+        """
+        Snapshots the state as a NumPy .npz archive: the sketch table, the LSH entries
+        as key/group arrays in LRU order and JSON metadata. Nothing in it is pickled, so
+        loading a snapshot never runs code.
+        """
+        path = path or self.snapshot_path
+        with self._lock:
+            table = self.sketch.table.copy()
+            lsh_keys = np.fromiter(self.lsh.keys(), dtype=np.uint64, count=len(self.lsh))
+            lsh_groups = np.fromiter(self.lsh.values(), dtype=np.uint64, count=len(self.lsh))
+            meta = {"origin": self.sketch.origin, "records": self.records}
+            self._last_snapshot = time.time()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, table=table, lsh_keys=lsh_keys, lsh_groups=lsh_groups, meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        with np.load(path, allow_pickle=False) as snapshot:
+            table = snapshot["table"]
+            lsh = OrderedDict(zip(snapshot["lsh_keys"].tolist(), snapshot["lsh_groups"].tolist()))
+            meta = json.loads(str(snapshot["meta"]))
+        with self._lock:
+            if table.shape == self.sketch.table.shape:
+                self.sketch.table = table
+                self.sketch.origin = meta["origin"]
+            self.lsh = lsh
+            self.records = meta["records"]
+
+    def stats(self) -> dict:
+        return {"records": self.records, "lsh_entries": len(self.lsh), "snapshot_path": self.snapshot_path}
@@ -0,0 +1,182 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-stage latencies range from sub-millisecond (label aggregation) to seconds (LLM calls)
+STAGE_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+
+def _format_labels(labels: dict, extra: dict = None) -> str:
+    labels = {**labels, **(extra or {})}
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram (Prometheus style cumulative buckets)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, buckets, description: str = "", labels: dict = None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, count in zip(self.buckets + [float("inf")], self._counts):
+                running += count
+                cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+            return {"buckets": cumulative, "count": self._count, "sum": self._sum}
+
+    def samples(self):
+        snapshot = self.snapshot()
+        for bound, count in snapshot["buckets"].items():
+            yield f"{self.name}_bucket{_format_labels(self.labels, {'le': bound})} {count}"
+        yield f"{self.name}_sum{_format_labels(self.labels)} {_format_value(snapshot['sum'])}"
+        yield f"{self.name}_count{_format_labels(self.labels)} {snapshot['count']}"
+
+
+class Gauge:
+    """A value that goes up and down, either set directly or read from `fn` at export time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str = "", labels: dict = None, fn=None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self.fn = fn
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def value(self) -> float:
+        if self.fn is not None:
+            return self.fn()
+        with self._lock:
+            return self._value
+
+    def samples(self):
+        yield f"{self.name}{_format_labels(self.labels)} {_format_value(self.value())}"
+
+
+class Counter(Gauge):
+    """A monotonically increasing total; `fn` can expose a count kept elsewhere (e.g. cache hits)."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        super().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        raise ValueError("Counters can only increase")
+
+
+class MetricsRegistry:
+    """
+    Named metrics of the process, rendered in the Prometheus text exposition format.
+
+    Metrics are created on first use and keyed by name and labels, so instrumented
+    code can simply ask for the metric it records into.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, labels: dict, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = cls(name, labels=labels, **kwargs)
+            elif metric.kind != cls.kind:
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.kind}")
+            return metric
+
+    def histogram(self, name: str, buckets=STAGE_BUCKETS, description: str = "", **labels) -> Histogram:
+        return self._get_or_create(Histogram, name, labels, buckets=buckets, description=description)
+
+    def gauge(self, name: str, description: str = "", fn=None, **labels) -> Gauge:
+        gauge = self._get_or_create(Gauge, name, labels, description=description)
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def counter(self, name: str, description: str = "", fn=None, **labels) -> Counter:
+        counter = self._get_or_create(Counter, name, labels, description=description)
+        if fn is not None:
+            counter.fn = fn
+        return counter
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items(), key=lambda item: item[0])
+        lines, described = [], set()
+        for (name, _), metric in metrics:
+            if name not in described:
+                described.add(name)
+                if metric.description:
+                    lines.append(f"# HELP {name} {metric.description}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+            try:
+                lines.extend(metric.samples())
+            except Exception:
+                # A failing callback must not break the whole export
+                continue
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def stage_histogram(stage: str, **labels) -> Histogram:
+    return REGISTRY.histogram("stage_duration_seconds", STAGE_BUCKETS, "Time spent per processing stage",
+                              stage=stage, **labels)
+
+
+@contextmanager
+def stage_timer(stage: str, **labels):
+    """Records the duration of the enclosed block in stage_duration_seconds{stage=...}."""
+    with stage_histogram(stage, **labels).time():
+        yield
@@ -0,0 +1,101 @@
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+def _folded_stack(frame) -> str:
+    """Frame stack in the folded format flamegraph tools read (outermost first, ';'-separated)."""
+    return ";".join(f"{entry.name} ({os.path.basename(entry.filename)}:{entry.lineno})"
+                    for entry in traceback.extract_stack(frame))
+
+
+class SlowRequestProfiler:
+    """
+    Opt-in sampling profiler for slow requests.
+
+    Requests are registered with `begin()`/`end()`. A background thread stays idle
+    until some request has run longer than `threshold_s`; from then on it samples the
+    stacks of every thread each `interval_s` until that request ends. The hottest
+    stacks are then written to `output_dir` in folded format (flamegraph.pl /
+    speedscope compatible) and logged. Samples cover the whole process (the event
+    loop and inference threads are shared), so dumps show where the time went while
+    the request was slow rather than strictly on its behalf.
+    """
+
+    def __init__(self, threshold_s: float, interval_s: float = 0.005, output_dir: str = None, top: int = 20):
+        self.threshold_s = threshold_s
+        self.interval_s = interval_s
+        self.output_dir = output_dir
+        self.top = top
+        self.dumps = 0
+        self._active = {}  # token -> (started, Counter of folded stacks)
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            if self.output_dir:
+                os.makedirs(self.output_dir, exist_ok=True)
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._sample_loop, name="slow-request-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def begin(self) -> int:
+        token = next(self._tokens)
+        with self._lock:
+            self._active[token] = (time.perf_counter(), Counter())
+        return token
+
+    def end(self, token: int, label: str):
+        with self._lock:
+            started, samples = self._active.pop(token, (None, None))
+        if started is None or not samples:
+            return
+        elapsed = time.perf_counter() - started
+        self._dump(label, elapsed, samples)
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while not self._stopped.is_set():
+            now = time.perf_counter()
+            with self._lock:
+                slow = [samples for started, samples in self._active.values() if now - started >= self.threshold_s]
+            if not slow:
+                self._stopped.wait(min(self.threshold_s / 4, 0.05))
+                continue
+            stacks = [_folded_stack(frame) for thread_id, frame in sys._current_frames().items() if thread_id != own_id]
+            for samples in slow:
+                samples.update(stacks)
+            self._stopped.wait(self.interval_s)
+
+    def _dump(self, label: str, elapsed: float, samples: Counter):
+        self.dumps += 1
+        hottest = samples.most_common(self.top)
+        if self.output_dir:
+            safe_label = "".join(c if c.isalnum() else "_" for c in label)[:60]
+            path = os.path.join(self.output_dir, f"slow-{int(time.time() * 1000)}-{safe_label}.folded")
+            with open(path, "w") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        leaf = "\n".join(f"  {count:5d}  {stack.rsplit(';', 1)[-1]}" for stack, count in hottest)
+        logger.warning("Slow request %s took %.3fs; hottest frames (%d samples):\n%s",
+                       label, elapsed, sum(samples.values()), leaf)
+
+    def stats(self) -> dict:
+        return {"threshold_s": self.threshold_s, "interval_s": self.interval_s, "dumps": self.dumps,
+                "active": len(self._active)}
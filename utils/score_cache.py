@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text: str) -> str:
+    """Normalization that never changes what the model sees beyond unicode form and edge whitespace."""
+    return unicodedata.normalize("NFC", text).strip()
+
+
+def cache_key(text: str, model_name: str, candidate_labels) -> str:
+    """Content address of a scoring call: model input text, model and candidate-label set."""
+    digest = hashlib.sha256()
+    for part in (model_name, "\x1f".join(sorted(candidate_labels)), normalize_text(text)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+class ScoreCache:
+    """
+    Two-tier cache of zero-shot label scores.
+
+    The in-memory tier is an LRU bounded by `max_entries`. When `db_path` is set, a
+    SQLite tier keeps every entry across restarts; disk hits are promoted to memory.
+    """
+
+    def __init__(self, max_entries: int = 50000, db_path: str = None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._connect()
+            # A SQLite connection must not be used across fork(): forked workers (api.serve) reconnect
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        # WAL keeps the per-insert commit cheap enough for the request path
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+
+    def _remember(self, key: str, scores: dict):
+        self._entries[key] = scores
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            scores = self._entries.get(key)
+            if scores is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(scores)
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM scores WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    scores = json.loads(row[0])
+                    self._remember(key, scores)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return dict(scores)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, scores: dict):
+        with self._lock:
+            self._remember(key, dict(scores))
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO scores (key, value) VALUES (?, ?)", (key, json.dumps(scores)))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Rough fixed per-message overhead (dict + two strings) added to the text length
+MESSAGE_OVERHEAD_BYTES = 200
+
+
+class Session:
+    """A server-side conversation: the agent holding its chat plus bookkeeping."""
+
+    def __init__(self, session_id: str, agent, variant: str):
+        self.session_id = session_id
+        self.agent = agent
+        self.variant = variant
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        self.lock = asyncio.Lock()
+        self.size_bytes = 0
+
+    def measure(self) -> int:
+        return sum(len(m["text"]) + len(m["role"]) + MESSAGE_OVERHEAD_BYTES for m in self.agent.chat)
+
+
+class SessionStore:
+    """
+    Bounded in-memory session store with LRU and TTL eviction.
+
+    Sessions idle for longer than `ttl_seconds` expire. When the store holds more
+    than `max_sessions` sessions or their chats exceed `max_bytes` in total, the
+    least recently used sessions are evicted first.
+    """
+
+    def __init__(self, max_sessions: int, ttl_seconds: float, max_bytes: int):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._bytes = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, agent, variant: str) -> Session:
+        session = Session(uuid.uuid4().hex, agent, variant)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._evict()
+        return session
+
+    def get(self, session_id: str):
+        """Returns the live session (marking it recently used) or None if unknown or expired."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.time() - session.last_access > self.ttl_seconds:
+                self._remove(session_id)
+                self.evictions += 1
+                return None
+            session.last_access = time.time()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._remove(session_id) is not None
+
+    def touch(self, session: Session):
+        """Re-measures a session after its chat changed and re-applies the bounds."""
+        with self._lock:
+            if session.session_id not in self._sessions:
+                return
+            size = session.measure()
+            self._bytes += size - session.size_bytes
+            session.size_bytes = size
+            self._evict(keep=session.session_id)
+
+    def _remove(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._bytes -= session.size_bytes
+        return session
+
+    def _evict(self, keep: str = None):
+        # Least recently used sessions come first in the OrderedDict, so both passes
+        # can stop at the first session that is allowed to stay.
+        now = time.time()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_access <= self.ttl_seconds:
+                break
+            if session_id != keep:
+                self._remove(session_id)
+                self.evictions += 1
+
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions and self._bytes <= self.max_bytes:
+                break
+            if session_id == keep:
+                continue
+            self._remove(session_id)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+
+
+class Taxonomy:
+    """
+    Precompiled mapping of fine-grained (hypothesis) labels to generic signal groups.
+
+    Fine labels are stored grouped by their generic label, so the max-reduce into
+    groups is one `np.maximum.reduceat` over a whole batch of score vectors, and
+    thresholding and ranking are plain array operations.
+    """
+
+    def __init__(self, mapping: dict, representatives: dict = None, benign_group: str = "Genuinity"):
+        self.mapping = dict(mapping)
+        self.fine_labels = sorted(self.mapping)
+        self.generic_labels = sorted(set(self.mapping.values()))
+        self.benign_group = benign_group
+        # One representative fine label per group for the label cascade (first one by default)
+        self.representatives = {group: representatives[group] if representatives and group in representatives
+                                else min(fine for fine, g in self.mapping.items() if g == group)
+                                for group in self.generic_labels}
+
+        generic_index = {label: i for i, label in enumerate(self.generic_labels)}
+        self.fine_index = {label: i for i, label in enumerate(self.fine_labels)}
+        group_of = np.array([generic_index[self.mapping[label]] for label in self.fine_labels])
+        self._order = np.argsort(group_of, kind="stable")
+        self._starts = np.searchsorted(group_of[self._order], np.arange(len(self.generic_labels)))
+        self.flaggable = np.array([label != benign_group for label in self.generic_labels])
+
+    @classmethod
+    def from_config(cls, path: str) -> "Taxonomy":
+        """
+        Loads a taxonomy from JSON:
+            {"mapping": {fine label: generic label, ...},
+             "representatives": {generic label: fine label, ...},  (optional)
+             "benign_group": "Genuinity"}  (optional)
+        """
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config["mapping"], config.get("representatives"), config.get("benign_group", "Genuinity"))
+
+    def score_matrix(self, scores_maps) -> np.ndarray:
+        """(n, n_fine) array of label -> score dicts; labels a dict lacks score 0."""
+        matrix = np.zeros((len(scores_maps), len(self.fine_labels)), dtype=np.float64)
+        for row, scores_map in enumerate(scores_maps):
+            for label, score in scores_map.items():
+                column = self.fine_index.get(label)
+                if column is not None:
+                    matrix[row, column] = score
+        return matrix
+
+    def aggregate(self, fine_scores: np.ndarray) -> np.ndarray:
+        """Max-reduces (n, n_fine) fine-label scores into (n, n_generic) group scores."""
+        return np.maximum.reduceat(fine_scores[:, self._order], self._starts, axis=1)
+
+    def rank(self, generic_scores: np.ndarray) -> np.ndarray:
+        """Group indices of each row ordered from highest to lowest score (ties keep label order)."""
+        return np.argsort(-generic_scores, axis=1, kind="stable")
+
+    def flags(self, generic_scores: np.ndarray, threshold: float) -> np.ndarray:
+        """Boolean (n, n_generic) mask of groups above `threshold`, never the benign group."""
+        return (generic_scores > threshold) & self.flaggable
+
+    def aggregate_maps(self, scores_maps) -> list:
+        """Generic label -> score dict per fine label -> score dict."""
+        generic = self.aggregate(self.score_matrix(scores_maps))
+        return [dict(zip(self.generic_labels, row.tolist())) for row in generic]
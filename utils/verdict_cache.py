@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def frequency_bucket(frequency) -> int:
+    """Order of magnitude of the starter-message frequency (0, 1-9, 10-99, ...)."""
+    if not frequency or frequency <= 0:
+        return 0
+    return int(math.log10(frequency)) + 1
+
+
+def verdict_key(conversation: str, frequency, model_name: str, prompt_version: str) -> str:
+    normalized = re.sub(r"\s+", " ", unicodedata.normalize("NFC", conversation)).strip()
+    digest = hashlib.sha256()
+    for part in (model_name, prompt_version, str(frequency_bucket(frequency)), normalized):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+class VerdictCache:
+    """
+    TTL + LRU cache of LLM verdicts with single-flight deduplication.
+
+    While a verdict for a key is being computed, identical requests wait for that
+    computation instead of starting their own; failures are shared with the waiters
+    but never cached. When the computing request is cancelled, a waiter takes over.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 24 * 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()  # key -> (verdict, expires_at)
+        self._lock = threading.Lock()
+        self._async_inflight = {}
+        self._sync_inflight = {}
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            verdict, expires_at = entry
+            if time.time() > expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return verdict
+
+    def put(self, key: str, verdict):
+        with self._lock:
+            self._entries[key] = (verdict, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, key: str):
+        verdict = self.get(key)
+        with self._lock:
+            if verdict is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return verdict
+
+    async def aget_or_compute(self, key: str, compute):
+        """Returns the cached verdict for `key`, or awaits `compute()` once for all concurrent callers."""
+        verdict = self._lookup(key)
+        if verdict is not None:
+            return verdict
+        while key in self._async_inflight:
+            future = self._async_inflight[key]
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only the leader was cancelled (e.g. by its request deadline): take over
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_inflight[key] = future
+        try:
+            verdict = await compute()
+            self.put(key, verdict)
+            future.set_result(verdict)
+            return verdict
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._async_inflight[key]
+
+    def get_or_compute(self, key: str, compute):
+        """Thread-based counterpart of aget_or_compute for synchronous callers."""
+        verdict = self._lookup(key)
+        if verdict is not None:
+            return verdict
+        with self._lock:
+            flight = self._sync_inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._sync_inflight[key] = {"done": threading.Event()}
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight["done"].wait()
+            if "error" in flight:
+                raise flight["error"]
+            return flight["verdict"]
+
+        try:
+            flight["verdict"] = compute()
+            self.put(key, flight["verdict"])
+            return flight["verdict"]
+        except BaseException as e:
+            # KeyboardInterrupt/SystemExit included: waiters must never see an empty flight
+            flight["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._sync_inflight[key]
+            flight["done"].set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "in_flight": len(self._async_inflight) + len(self._sync_inflight),
+            }
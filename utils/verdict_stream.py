@@ -0,0 +1,68 @@
+import re
+
+_LABEL = re.compile(r'"label"\s*:\s*"([^"]*)"')
+# A number is only complete once something that cannot belong to it follows
+_CONFIDENCE = re.compile(r'"confidence"\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)\s*[,}\s]')
+_TACTICS_START = re.compile(r'"tactics"\s*:\s*\[')
+_STRING = re.compile(r'\s*,?\s*"([^"]*)"')
+_ARRAY_END = re.compile(r'\s*,?\s*\]')
+
+
+class VerdictStreamParser:
+    """
+    Incremental parser for a streamed ConversationalScamVerdict JSON object.
+
+    `feed(chunk)` returns the (field, value) events that became complete with that
+    chunk: ("label", str), ("confidence", float), one ("tactic", str) per tactic and
+    ("tactics_done", list) when the tactics array closes.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.label = None
+        self.confidence = None
+        self.tactics = []
+        self.tactics_done = False
+        self._tactics_pos = None
+
+    @property
+    def has_required(self) -> bool:
+        return self.label is not None and self.confidence is not None
+
+    @property
+    def complete(self) -> bool:
+        return self.has_required and self.tactics_done
+
+    def verdict(self) -> dict:
+        return {"label": self.label, "confidence": self.confidence, "tactics": list(self.tactics)}
+
+    def feed(self, chunk: str):
+        self.buffer += chunk
+        events = []
+        if self.label is None:
+            match = _LABEL.search(self.buffer)
+            if match:
+                self.label = match.group(1)
+                events.append(("label", self.label))
+        if self.confidence is None:
+            match = _CONFIDENCE.search(self.buffer)
+            if match:
+                self.confidence = float(match.group(1))
+                events.append(("confidence", self.confidence))
+        if not self.tactics_done:
+            if self._tactics_pos is None:
+                match = _TACTICS_START.search(self.buffer)
+                if match:
+                    self._tactics_pos = match.end()
+            while self._tactics_pos is not None:
+                match = _STRING.match(self.buffer, self._tactics_pos)
+                if match:
+                    self.tactics.append(match.group(1))
+                    self._tactics_pos = match.end()
+                    events.append(("tactic", match.group(1)))
+                    continue
+                if _ARRAY_END.match(self.buffer, self._tactics_pos):
+                    self.tactics_done = True
+                    events.append(("tactics_done", list(self.tactics)))
+                break
+        return events